@@ -1,12 +1,26 @@
 from fastapi import FastAPI
 from routes.model_training_routes import model_routes
 from routes.predictions_routes import predictions_routes
+from routes.jobs_routes import jobs_routes
+from routes.upload_routes import upload_routes
+from routes.live_routes import live_routes
+from routes.commentary_routes import commentary_routes
+from logic.jobs import job_manager
+from logic.live_analysis import stop_all_sessions
 
 app = FastAPI()
 
 # Include the router from routes.py
 app.include_router(model_routes)
 app.include_router(predictions_routes)
+app.include_router(jobs_routes)
+app.include_router(upload_routes)
+app.include_router(live_routes)
+app.include_router(commentary_routes)
+
+# Stop the background job workers with the server.
+app.add_event_handler("shutdown", job_manager.shutdown)
+app.add_event_handler("shutdown", stop_all_sessions)
 
 # To run the app use:
 # uvicorn app:app --reload
@@ -0,0 +1,92 @@
+"""
+Throughput vs accuracy benchmark for the video detection modes and inference backends.
+
+Run from the backend directory:
+    python -m logic.benchmark uploads/my_vid.mp4 --strides 1 2 4 --adaptive
+    python -m logic.benchmark uploads/my_vid.mp4 --strides 1 --backends pytorch onnx onnx-int8 openvino
+"""
+import argparse
+import time
+from typing import Dict, List, Tuple
+
+from logic.inference_backend import BACKENDS
+from logic.model_registry import registry
+from logic.predictions_logic import (GameEvent, detect_video_store, detection_models, inference_stats,
+                                     player_stats, process_frames_with_sliding_window)
+
+
+def match_events(reference: List[GameEvent], candidate: List[GameEvent],
+                 tolerance: float = 0.5) -> Tuple[float, float]:
+    """
+    Precision and recall of candidate events against reference events.
+    Two events match when they have the same type and details and are at most
+    tolerance seconds apart; each reference event matches at most once.
+    """
+    unmatched = list(reference)
+    hits = 0
+    for event in candidate:
+        for i, ref in enumerate(unmatched):
+            if (ref.event_type == event.event_type and ref.details == event.details
+                    and abs(ref.time - event.time) <= tolerance):
+                hits += 1
+                del unmatched[i]
+                break
+    precision = hits / len(candidate) if candidate else 1.0
+    recall = hits / len(reference) if reference else 1.0
+    return precision, recall
+
+
+def run_mode(video_path: str, backend: str, stride: int, adaptive: bool, window_size: int,
+             frame_rate: float) -> Dict[str, object]:
+    registry.backend = backend
+    # Load (and export, if needed) outside the timed section.
+    detection_models()
+    start = time.perf_counter()
+    store = detect_video_store(video_path, stride=stride, adaptive=adaptive)
+    elapsed = time.perf_counter() - start
+    calls = inference_stats["yolo_model"] + inference_stats["model"]
+    detected = inference_stats["frames"]
+    player_stats.clear()
+    events = process_frames_with_sliding_window(store, window_size, frame_rate)
+    return {
+        "mode": f"{backend} stride={stride}" + (" adaptive" if adaptive else ""),
+        "frames": len(store),
+        "detected": detected,
+        "calls": calls,
+        "seconds": elapsed,
+        "fps": len(store) / elapsed if elapsed else 0.0,
+        "events": events,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video")
+    parser.add_argument("--strides", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--adaptive", action="store_true", help="also run adaptive mode for each stride")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=[registry.backend],
+                        help="inference backends to compare; the first is the reference")
+    parser.add_argument("--window-size", type=int, default=10)
+    parser.add_argument("--frame-rate", type=float, default=30.0)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="event time tolerance in seconds")
+    args = parser.parse_args()
+
+    modes = [(1, False)] + [(s, False) for s in args.strides if s != 1]
+    if args.adaptive:
+        modes += [(s, True) for s in args.strides]
+
+    runs = [run_mode(args.video, backend, stride, adaptive, args.window_size, args.frame_rate)
+            for backend in args.backends for stride, adaptive in modes]
+    reference = runs[0]["events"]
+
+    print(f"\n{'mode':<34}{'frames':>8}{'detected':>10}{'calls':>8}{'fps':>9}"
+          f"{'speedup':>9}{'events':>8}{'precision':>11}{'recall':>8}")
+    for run in runs:
+        precision, recall = match_events(reference, run["events"], args.tolerance)
+        speedup = runs[0]["seconds"] / run["seconds"] if run["seconds"] else 0.0
+        print(f"{run['mode']:<34}{run['frames']:>8}{run['detected']:>10}{run['calls']:>8}"
+              f"{run['fps']:>9.1f}{speedup:>8.2f}x{len(run['events']):>8}{precision:>11.2f}{recall:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import os
+import json
+import time
+from typing import Any, Dict, Optional
+
+from logic import disk_cache
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.getenv("COMMENTARY_CACHE_DIR", os.path.join(backend_dir, "cache", "commentary"))
+# Disk budget for cached commentary text and audio together.
+MAX_CACHE_BYTES = int(os.getenv("COMMENTARY_CACHE_MAX_BYTES", str(512 * 1024 ** 2)))
+# Entries used this recently are never evicted, as their audio files may be queued for playback.
+EVICTION_GRACE_SECONDS = 600
+
+# Part of every key, so entries written in an older format are never read back.
+CACHE_FORMAT_VERSION = 1
+
+TEXT_DIR = os.path.join(CACHE_DIR, "text")
+AUDIO_DIR = os.path.join(CACHE_DIR, "audio")
+# Hit / miss counters of every process using the cache.
+STATS_PATH = os.path.join(CACHE_DIR, "stats.json")
+STAT_NAMES = ("text_hits", "text_misses", "audio_hits", "audio_misses")
+
+
+def text_key(prompt: str, model: str, config: Dict[str, Any]) -> str:
+    """Key for the commentary a text model writes for prompt with the given generation config."""
+    return disk_cache.content_key({"version": CACHE_FORMAT_VERSION, "prompt": prompt, "model": model,
+                                   "config": config})
+
+
+def audio_key(text: str, voice_id: str, model_id: str, output_format: str) -> str:
+    """Key for the speech a TTS model produces for text in a voice and format."""
+    return disk_cache.content_key({"version": CACHE_FORMAT_VERSION, "text": text, "voice": voice_id,
+                                   "model": model_id, "format": output_format})
+
+
+def text_path(key: str) -> str:
+    return os.path.join(TEXT_DIR, f"{key}.json")
+
+
+def audio_path(key: str) -> str:
+    return os.path.join(AUDIO_DIR, f"{key}.mp3")
+
+
+def _count(name: str):
+    disk_cache.add_counts(STATS_PATH, {name: 1})
+
+
+def load_text(key: str) -> Optional[str]:
+    """Cached commentary for key, or None on a miss."""
+    path = text_path(key)
+    try:
+        with open(path) as f:
+            text = json.load(f)["text"]
+    except (OSError, ValueError, KeyError):
+        _count("text_misses")
+        return None
+    disk_cache.touch(path)
+    _count("text_hits")
+    return text
+
+
+def save_text(key: str, text: str, meta: Optional[Dict[str, Any]] = None):
+    disk_cache.write_atomic(text_path(key),
+                            json.dumps({**(meta or {}), "text": text, "created": time.time()}).encode())
+    evict(MAX_CACHE_BYTES)
+
+
+def load_audio(key: str) -> Optional[str]:
+    """Path of the cached audio for key, or None on a miss."""
+    path = audio_path(key)
+    if not disk_cache.touch(path):
+        _count("audio_misses")
+        return None
+    _count("audio_hits")
+    return path
+
+
+def save_audio(key: str, audio: bytes) -> str:
+    """Stores audio for key and returns its path."""
+    path = audio_path(key)
+    disk_cache.write_atomic(path, audio)
+    evict(MAX_CACHE_BYTES)
+    return path
+
+
+def evict(max_bytes: int = MAX_CACHE_BYTES):
+    entries = disk_cache.file_entries(TEXT_DIR) + disk_cache.file_entries(AUDIO_DIR)
+    disk_cache.evict_lru(entries, max_bytes, os.unlink, keep_since=time.time() - EVICTION_GRACE_SECONDS)
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Hit / miss counts of all processes since the cache was created, and its size on disk."""
+    counts = disk_cache.read_counts(STATS_PATH)
+    stats: Dict[str, Any] = {name: counts.get(name, 0) for name in STAT_NAMES}
+    for kind in ("text", "audio"):
+        lookups = stats[f"{kind}_hits"] + stats[f"{kind}_misses"]
+        stats[f"{kind}_hit_rate"] = stats[f"{kind}_hits"] / lookups if lookups else 0.0
+    entries = disk_cache.file_entries(TEXT_DIR) + disk_cache.file_entries(AUDIO_DIR)
+    return {**stats, "entries": len(entries), "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": MAX_CACHE_BYTES}
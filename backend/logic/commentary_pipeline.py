@@ -0,0 +1,209 @@
+"""
+Asynchronous commentary generation: Gemini text and ElevenLabs speech for many
+events at once, over pooled HTTP connections with bounded concurrency and
+rate-limit-aware retries. Text and audio are cached by content (see
+logic/commentary_cache.py), so recurring prompts cost no requests.
+
+The REST endpoints are configurable, so the pipeline can run offline against
+the stand-in servers in logic/commentary_standin.py:
+    uvicorn logic.commentary_standin:app --port 8090
+    GEMINI_BASE_URL=http://127.0.0.1:8090 ELEVENLABS_BASE_URL=http://127.0.0.1:8090 ...
+"""
+import os
+import time
+import random
+import asyncio
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+from starlette.concurrency import run_in_threadpool
+
+from logic import commentary_cache
+from logic.commentary_playback import clip_duration
+
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com")
+ELEVENLABS_BASE_URL = os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io")
+GEMINI_MODEL = "gemini-2.0-flash"
+GEMINI_MAX_OUTPUT_TOKENS = 50
+GEMINI_TEMPERATURE = 0.8
+VOICE_ID = "29vD33N1CtxCmqQRPOHJ"
+TTS_MODEL_ID = "eleven_multilingual_v2"
+TTS_OUTPUT_FORMAT = "mp3_44100_128"
+
+# Requests in flight per service.
+COMMENTARY_CONCURRENCY = int(os.getenv("COMMENTARY_CONCURRENCY", "8"))
+# Attempts per request for rate limits (429), server errors (5xx) and network errors.
+MAX_ATTEMPTS = 5
+# First retry delay in seconds when the server gives no Retry-After; doubles per attempt.
+RETRY_BASE_DELAY = 0.5
+MAX_RETRY_DELAY = 30.0
+REQUEST_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+
+class CommentaryError(Exception):
+    """A commentary or speech request failed for good."""
+
+
+def retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta seconds or HTTP date), if any."""
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+async def request_with_retries(client: httpx.AsyncClient, method: str, url: str, **kwargs) -> httpx.Response:
+    """
+    Sends a request, retrying 429 / 5xx responses and network errors up to
+    MAX_ATTEMPTS times. Waits as long as Retry-After asks, otherwise backs off
+    exponentially with jitter. Other error responses raise immediately.
+    """
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            if attempt == MAX_ATTEMPTS:
+                raise CommentaryError(f"{method} {url} failed: {e}") from e
+            delay = None
+        else:
+            if response.status_code < 400:
+                return response
+            if response.status_code != 429 and response.status_code < 500:
+                raise CommentaryError(f"{method} {url} returned {response.status_code}: {response.text[:200]}")
+            if attempt == MAX_ATTEMPTS:
+                raise CommentaryError(f"{method} {url} returned {response.status_code} after {attempt} attempts")
+            delay = retry_after(response)
+        if delay is None:
+            delay = RETRY_BASE_DELAY * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+        await asyncio.sleep(min(delay, MAX_RETRY_DELAY))
+
+
+async def gemini_commentary(client: httpx.AsyncClient, prompt: str) -> str:
+    """Async equivalent of generate_commentary_for_event, via the Gemini REST API."""
+    response = await request_with_retries(
+        client, "POST", f"/v1beta/models/{GEMINI_MODEL}:generateContent",
+        params={"key": os.getenv("GEMINI_API_KEY", "")},
+        json={"contents": [{"parts": [{"text": prompt}]}],
+              "generationConfig": {"maxOutputTokens": GEMINI_MAX_OUTPUT_TOKENS,
+                                   "temperature": GEMINI_TEMPERATURE}})
+    candidates = response.json().get("candidates") or [{}]
+    parts = candidates[0].get("content", {}).get("parts", [])
+    commentary = "".join(part.get("text", "") for part in parts).strip()
+    if not commentary:
+        raise CommentaryError("Gemini API returned an empty response")
+    return commentary
+
+
+async def elevenlabs_speech(client: httpx.AsyncClient, text: str) -> bytes:
+    """Async equivalent of text_to_speech_elevenlabs, via the ElevenLabs REST API; returns MP3 bytes."""
+    response = await request_with_retries(
+        client, "POST", f"/v1/text-to-speech/{VOICE_ID}",
+        params={"output_format": TTS_OUTPUT_FORMAT},
+        headers={"xi-api-key": os.getenv("ELEVENLABS_API_KEY", "")},
+        json={"text": text, "model_id": TTS_MODEL_ID})
+    if not response.content:
+        raise CommentaryError("ElevenLabs API error: No audio content returned.")
+    return response.content
+
+
+def commentary_key(prompt: str) -> str:
+    """Cache key for the Gemini commentary on prompt."""
+    return commentary_cache.text_key(prompt, GEMINI_MODEL, {"max_output_tokens": GEMINI_MAX_OUTPUT_TOKENS,
+                                                             "temperature": GEMINI_TEMPERATURE})
+
+
+def speech_key(text: str) -> str:
+    """Cache key for the ElevenLabs speech of text."""
+    return commentary_cache.audio_key(text, VOICE_ID, TTS_MODEL_ID, TTS_OUTPUT_FORMAT)
+
+
+async def cached_commentary(client: httpx.AsyncClient, prompt: str) -> str:
+    key = commentary_key(prompt)
+    commentary = await run_in_threadpool(commentary_cache.load_text, key)
+    if commentary is None:
+        commentary = await gemini_commentary(client, prompt)
+        await run_in_threadpool(commentary_cache.save_text, key, commentary, {"prompt": prompt})
+    return commentary
+
+
+async def cached_speech(client: httpx.AsyncClient, text: str) -> str:
+    """Path of the cached MP3 for text, requesting it on a miss."""
+    key = speech_key(text)
+    path = await run_in_threadpool(commentary_cache.load_audio, key)
+    if path is None:
+        audio = await elevenlabs_speech(client, text)
+        path = await run_in_threadpool(commentary_cache.save_audio, key, audio)
+    return path
+
+
+async def shared(pending: Dict[str, asyncio.Task], key: str, make):
+    """Runs make() once per key, so identical requests in one batch share the result."""
+    if key not in pending:
+        pending[key] = asyncio.ensure_future(make())
+    return await asyncio.shield(pending[key])
+
+
+def make_client(base_url: str, concurrency: int, transport: Optional[httpx.AsyncBaseTransport] = None):
+    """One pooled, keep-alive client per service."""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    return httpx.AsyncClient(base_url=base_url, limits=limits, timeout=REQUEST_TIMEOUT, transport=transport)
+
+
+async def generate_commentary_segments(events: List[Dict[str, Any]],
+                                       concurrency: int = COMMENTARY_CONCURRENCY,
+                                       gemini_transport: Optional[httpx.AsyncBaseTransport] = None,
+                                       elevenlabs_transport: Optional[httpx.AsyncBaseTransport] = None
+                                       ) -> List[Dict[str, Any]]:
+    """
+    Generates commentary text and audio for all events concurrently, at most
+    concurrency requests in flight per service. Returns segments
+    ({"time", "commentary", "audio_file", "duration"}) in event time order; events whose
+    requests fail after retries are reported and left out. audio_file is the
+    clip's content-addressed path in the commentary cache.
+    The transports are for tests (e.g. httpx.ASGITransport over the stand-in app).
+    """
+    # Imported here because logic.elevenlabsgemini imports this module.
+    from logic.elevenlabsgemini import generate_commentary_prompt
+
+    events = sorted(events, key=lambda event: event["time"])
+    gemini_slots = asyncio.Semaphore(concurrency)
+    speech_slots = asyncio.Semaphore(concurrency)
+
+    async with make_client(GEMINI_BASE_URL, concurrency, gemini_transport) as gemini, \
+            make_client(ELEVENLABS_BASE_URL, concurrency, elevenlabs_transport) as elevenlabs:
+
+        pending: Dict[str, asyncio.Task] = {}
+
+        async def commentary_for(prompt: str) -> str:
+            async with gemini_slots:
+                return await cached_commentary(gemini, prompt)
+
+        async def speech_for(text: str) -> str:
+            async with speech_slots:
+                return await cached_speech(elevenlabs, text)
+
+        async def segment_for(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            prompt = generate_commentary_prompt(event)
+            try:
+                commentary = await shared(pending, commentary_key(prompt), lambda: commentary_for(prompt))
+                audio_file = await shared(pending, speech_key(commentary), lambda: speech_for(commentary))
+            except CommentaryError as e:
+                print(f"No commentary for event at {event['time']:.2f}s: {e}")
+                return None
+            duration = await run_in_threadpool(clip_duration, audio_file)
+            return {"time": event["time"], "commentary": commentary, "audio_file": audio_file,
+                    "duration": duration}
+
+        segments = await asyncio.gather(*(segment_for(event) for event in events))
+    stats = commentary_cache.cache_stats()
+    print(f"Commentary cache totals: text {stats['text_hits']} hits / {stats['text_misses']} misses, "
+          f"audio {stats['audio_hits']} hits / {stats['audio_misses']} misses")
+    return [segment for segment in segments if segment is not None]
@@ -0,0 +1,85 @@
+"""
+Plays commentary clips in sync with the video, driven by the event loop.
+Each clip is due at start + segment["time"] on the monotonic clock; waits are
+measured from that clock rather than accumulated, so one slow clip never
+shifts the rest. A clip that starts late is dropped, and one that would run
+into the next clip is cut short at the next clip's start time.
+Durations are read once, before playback starts.
+"""
+import os
+import time
+import asyncio
+import shlex
+from typing import Any, Dict, List, Optional
+
+# Player for one clip; "-t <seconds>" and the file path are appended.
+PLAYER_COMMAND = shlex.split(os.getenv("COMMENTARY_PLAYER", "ffplay -nodisp -autoexit -loglevel quiet"))
+# Clips starting later than this (seconds) are dropped.
+MAX_CLIP_LATENESS = 1.0
+# Clips that would be cut to less than this (seconds) are dropped rather than played.
+MIN_CLIP_SECONDS = 1.0
+
+
+def clip_duration(path: str) -> float:
+    """Length of an MP3 clip in seconds."""
+    from mutagen.mp3 import MP3
+    return MP3(path).info.length
+
+
+def with_durations(segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Segments in time order, each with its clip's "duration"."""
+    return sorted(({**segment, "duration": segment.get("duration") or clip_duration(segment["audio_file"])}
+                   for segment in segments), key=lambda segment: segment["time"])
+
+
+async def _stop(process: Optional[asyncio.subprocess.Process]):
+    if process is not None and process.returncode is None:
+        process.terminate()
+        await process.wait()
+
+
+async def play_commentary(segments: List[Dict[str, Any]],
+                          start: Optional[float] = None,
+                          max_lateness: float = MAX_CLIP_LATENESS,
+                          min_clip_seconds: float = MIN_CLIP_SECONDS) -> Dict[str, int]:
+    """
+    Plays segments ({"time", "audio_file"}, optionally "duration") at their
+    video times. start is the time.monotonic() at which the video started
+    (default: now). Returns how many clips were played in full, shortened
+    and dropped.
+    """
+    start = time.monotonic() if start is None else start
+    segments = await asyncio.to_thread(with_durations, segments)
+    counts = {"played": 0, "shortened": 0, "dropped": 0}
+    process = None
+    try:
+        for i, segment in enumerate(segments):
+            due = start + segment["time"]
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            now = time.monotonic()
+            # The previous clip never plays past this one's start.
+            await _stop(process)
+            process = None
+
+            seconds = segment["duration"]
+            if i + 1 < len(segments):
+                seconds = min(seconds, start + segments[i + 1]["time"] - now)
+            if now - due > max_lateness or seconds < min_clip_seconds:
+                counts["dropped"] += 1
+                print(f"Dropped commentary for event at {segment['time']:.2f}s ({now - due:.2f}s late)")
+                continue
+
+            process = await asyncio.create_subprocess_exec(
+                *PLAYER_COMMAND, "-t", f"{seconds:.3f}", segment["audio_file"],
+                stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+            shortened = seconds < segment["duration"]
+            counts["shortened" if shortened else "played"] += 1
+            print(f"Playing commentary for event at {segment['time']:.2f}s"
+                  + (f" (cut to {seconds:.2f}s)" if shortened else ""))
+        if process is not None:
+            await process.wait()
+    finally:
+        await _stop(process)
+    return counts
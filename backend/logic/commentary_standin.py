@@ -0,0 +1,70 @@
+"""
+Local stand-ins for the Gemini and ElevenLabs endpoints used by
+logic/commentary_pipeline.py, for running the commentary pipeline offline.
+Both APIs are served by one app, with simulated latency and rate limiting:
+
+    STANDIN_LATENCY=0.8 STANDIN_RATE_LIMIT=0.1 uvicorn logic.commentary_standin:app --port 8090
+
+The generated audio is silent MP3 whose duration follows the text length, so
+mutagen and the players can read it like real speech.
+"""
+import os
+import random
+import asyncio
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+# Seconds each request takes (plus up to 50% jitter).
+STANDIN_LATENCY = float(os.getenv("STANDIN_LATENCY", "0.5"))
+# Fraction of requests answered with 429 and a Retry-After header.
+STANDIN_RATE_LIMIT = float(os.getenv("STANDIN_RATE_LIMIT", "0.0"))
+# Simulated speaking rate for the audio length.
+WORDS_PER_SECOND = 2.5
+
+# One MPEG-1 Layer III frame: 128 kbps, 44.1 kHz, stereo, no padding (417 bytes, 1152 samples).
+MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0x04]) + bytes(413)
+MP3_FRAME_SECONDS = 1152 / 44100
+
+app = FastAPI()
+stats = {"requests": 0, "rate_limited": 0}
+
+
+async def simulate(request: Request):
+    """Latency for every request; a 429 response for some."""
+    stats["requests"] += 1
+    await asyncio.sleep(STANDIN_LATENCY * random.uniform(1.0, 1.5))
+    if random.random() < STANDIN_RATE_LIMIT:
+        stats["rate_limited"] += 1
+        return JSONResponse({"error": "rate limited"}, status_code=429, headers={"Retry-After": "1"})
+    return None
+
+
+def silent_mp3(seconds: float) -> bytes:
+    return MP3_FRAME * max(1, round(seconds / MP3_FRAME_SECONDS))
+
+
+@app.post("/v1beta/models/{model}:generateContent")
+async def generate_content(model: str, request: Request):
+    limited = await simulate(request)
+    if limited is not None:
+        return limited
+    body = await request.json()
+    prompt = body["contents"][0]["parts"][0]["text"]
+    # The event line is the last line of the prompt.
+    line = prompt.strip().splitlines()[-1]
+    return {"candidates": [{"content": {"parts": [{"text": f"What a moment! {line}"}], "role": "model"}}]}
+
+
+@app.post("/v1/text-to-speech/{voice_id}")
+async def text_to_speech(voice_id: str, request: Request):
+    limited = await simulate(request)
+    if limited is not None:
+        return limited
+    body = await request.json()
+    seconds = len(body["text"].split()) / WORDS_PER_SECOND
+    return Response(silent_mp3(seconds), media_type="audio/mpeg")
+
+
+@app.get("/stats")
+async def standin_stats():
+    return stats
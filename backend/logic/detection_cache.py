@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from logic import disk_cache
+from logic.detection_store import DetectionStore
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.getenv("DETECTION_CACHE_DIR", os.path.join(backend_dir, "cache", "detections"))
+# Total size the cache may use on disk before the least recently used entries are evicted.
+MAX_CACHE_BYTES = int(os.getenv("DETECTION_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+# Bump when the layout of cached detections changes.
+CACHE_FORMAT_VERSION = 1
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Weight file hashes keyed by (path, size, mtime), so unchanged weights are hashed once.
+_weights_hashes: Dict[Tuple[str, int, int], str] = {}
+
+
+def file_sha256(path: str) -> str:
+    """Content hash of a file, read in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def weights_sha256(path: str) -> str:
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _weights_hashes:
+        _weights_hashes[key] = file_sha256(path)
+    return _weights_hashes[key]
+
+
+def cache_key(video_hash: str, weight_paths: List[str], params: Dict[str, Any]) -> str:
+    """
+    Key for one video analysed with given model weights and detection parameters.
+    Any change to the video content, either weight file or a parameter gives a new key.
+    """
+    payload = {
+        "version": CACHE_FORMAT_VERSION,
+        "video": video_hash,
+        "weights": [weights_sha256(path) for path in weight_paths],
+        "params": params,
+    }
+    return disk_cache.content_key(payload)
+
+
+def _entry_dir(key: str) -> str:
+    return os.path.join(CACHE_DIR, key)
+
+
+def load(key: str) -> Optional[DetectionStore]:
+    """Returns the memory-mapped detections for key, or None on a miss."""
+    entry = _entry_dir(key)
+    meta_path = os.path.join(entry, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        store = DetectionStore.load(entry)
+    except (OSError, ValueError) as e:
+        print(f"Discarding unreadable detection cache entry {key}. Reason: {e}")
+        shutil.rmtree(entry, ignore_errors=True)
+        return None
+    # The meta file's mtime records when the entry was last used, for LRU eviction.
+    disk_cache.touch(meta_path)
+    return store
+
+
+def save(key: str, store: DetectionStore, meta: Optional[Dict[str, Any]] = None):
+    """Writes detections for key atomically, then evicts old entries if over budget."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    entry = _entry_dir(key)
+    tmp = f"{entry}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    store.save(tmp)
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({**(meta or {}), "frames": len(store), "created": time.time()}, f)
+    try:
+        os.rename(tmp, entry)
+    except OSError:
+        # Another worker cached the same video first.
+        shutil.rmtree(tmp, ignore_errors=True)
+    evict(MAX_CACHE_BYTES)
+
+
+def evict(max_bytes: int = MAX_CACHE_BYTES):
+    """Removes least recently used entries until the cache fits in max_bytes."""
+    entries = disk_cache.dir_entries(CACHE_DIR, "meta.json")
+    for path in disk_cache.evict_lru(entries, max_bytes, shutil.rmtree):
+        print(f"Evicted detection cache entry {os.path.basename(path)}")
+
+
+def get_or_compute(video_path: str,
+                   weight_paths: List[str],
+                   params: Dict[str, Any],
+                   compute: Callable[[], DetectionStore],
+                   video_hash: Optional[str] = None) -> DetectionStore:
+    """
+    Returns cached detections for the video if they exist, otherwise runs
+    compute() and caches its result. video_hash can be passed when the content
+    hash is already known (e.g. computed while uploading).
+    """
+    video_hash = video_hash or file_sha256(video_path)
+    key = cache_key(video_hash, weight_paths, params)
+    store = load(key)
+    if store is not None:
+        print(f"Detection cache hit for {video_path}")
+        return store
+    store = compute()
+    save(key, store, {"video": os.path.basename(video_path), "video_hash": video_hash, "params": params})
+    return store
@@ -0,0 +1,191 @@
+import os
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Class ids, matching the general detector's classes.
+BALL = 0
+PLAYER = 1
+RIM = 2
+
+# Key of each class in the frame detection dictionaries built by process_video.
+FRAME_KEYS = {BALL: "ball", PLAYER: "user_id", RIM: "rim"}
+OBJECT_TYPES = {BALL: "ball", PLAYER: "player", RIM: "rim"}
+
+# Stored in the user_id column for detections without a user id.
+NO_USER = -1
+
+COLUMNS = ("frame", "cls", "bbox", "confidence", "user_id")
+
+
+class DetectionView:
+    """Lightweight read-only view of one stored detection."""
+    __slots__ = ("frame", "object_type", "bounding_box", "confidence", "user_id")
+
+    def __init__(self, frame: int, object_type: str, bounding_box: Tuple[float, float, float, float],
+                 confidence: float, user_id: Optional[int]):
+        self.frame = frame
+        self.object_type = object_type
+        self.bounding_box = bounding_box
+        self.confidence = confidence
+        self.user_id = user_id
+
+    def __repr__(self):
+        return (f"DetectionView(frame={self.frame}, object_type={self.object_type!r}, "
+                f"bounding_box={self.bounding_box}, confidence={self.confidence:.3f}, user_id={self.user_id})")
+
+
+class DetectionStore:
+    """
+    Columnar, array-backed store of per-frame detections.
+
+    Every detection is one row across a set of contiguous NumPy columns (frame
+    index, class, bbox, confidence, user_id), sorted by frame. offsets[i] is the
+    first row of frame i, so a frame's detections are a single slice. This
+    replaces the lists of dicts of lists of dicts built by process_video.
+    """
+    def __init__(self, capacity: int = 1024):
+        capacity = max(capacity, 1)
+        self.frame = np.empty(capacity, dtype=np.int32)
+        self.cls = np.empty(capacity, dtype=np.int8)
+        self.bbox = np.empty((capacity, 4), dtype=np.float64)
+        self.confidence = np.empty(capacity, dtype=np.float32)
+        self.user_id = np.empty(capacity, dtype=np.int32)
+        self.offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self.size = 0
+        self.frame_count = 0
+
+    def __len__(self) -> int:
+        return self.frame_count
+
+    def _reserve(self, rows: int, frames: int):
+        """Grows the columns (by doubling) to fit the given number of extra rows and frames."""
+        needed = self.size + rows
+        if needed > len(self.frame):
+            capacity = max(needed, 2 * len(self.frame))
+            for name in COLUMNS:
+                column = getattr(self, name)
+                grown = np.empty((capacity,) + column.shape[1:], dtype=column.dtype)
+                grown[:self.size] = column[:self.size]
+                setattr(self, name, grown)
+        needed = self.frame_count + frames + 1
+        if needed > len(self.offsets):
+            grown = np.zeros(max(needed, 2 * len(self.offsets)), dtype=np.int64)
+            grown[:self.frame_count + 1] = self.offsets[:self.frame_count + 1]
+            self.offsets = grown
+
+    def append_frame(self, frame: dict) -> int:
+        """Appends one {"ball", "rim", "user_id"} frame dictionary and returns its frame index."""
+        rows = [(cls, detection) for cls, key in FRAME_KEYS.items() for detection in frame.get(key, ())]
+        self._reserve(len(rows), 1)
+        index = self.frame_count
+        start = self.size
+        for row, (cls, detection) in enumerate(rows, start):
+            user_id = detection.get("user_id") if cls == PLAYER else None
+            self.frame[row] = index
+            self.cls[row] = cls
+            self.bbox[row] = detection["bounding_box"]
+            self.confidence[row] = detection["confidence"]
+            self.user_id[row] = NO_USER if user_id is None else user_id
+        self.size = start + len(rows)
+        self.frame_count = index + 1
+        self.offsets[self.frame_count] = self.size
+        return index
+
+    def extend(self, frames: Iterable[dict]):
+        for frame in frames:
+            self.append_frame(frame)
+
+    @classmethod
+    def from_frames(cls, frames: Iterable[dict]) -> "DetectionStore":
+        store = cls()
+        store.extend(frames)
+        return store
+
+    def slice_frames(self, start: int, stop: Optional[int] = None) -> "DetectionStore":
+        """Copy of frames [start, stop), renumbered from 0."""
+        stop = self.frame_count if stop is None else min(stop, self.frame_count)
+        start = min(start, stop)
+        rows = self.rows(start, stop)
+        store = DetectionStore.__new__(DetectionStore)
+        for name in COLUMNS:
+            setattr(store, name, np.array(getattr(self, name)[rows]))
+        store.frame -= start
+        store.offsets = self.offsets[start:stop + 1] - self.offsets[start]
+        store.size = rows.stop - rows.start
+        store.frame_count = stop - start
+        return store
+
+    @classmethod
+    def concat(cls, stores: List["DetectionStore"]) -> "DetectionStore":
+        """Joins stores of consecutive frame ranges into one store, in order."""
+        store = cls.__new__(cls)
+        frame_base = np.cumsum([0] + [part.frame_count for part in stores])
+        row_base = np.cumsum([0] + [part.size for part in stores])
+        for name in COLUMNS:
+            parts = [getattr(part, name)[:part.size] for part in stores]
+            if name == "frame":
+                parts = [(part + base).astype(np.int32) for part, base in zip(parts, frame_base)]
+            setattr(store, name, np.concatenate(parts) if parts else getattr(cls(), name)[:0])
+        store.offsets = np.concatenate([np.zeros(1, dtype=np.int64)] +
+                                       [part.offsets[1:part.frame_count + 1] + base
+                                        for part, base in zip(stores, row_base)])
+        store.size = int(row_base[-1])
+        store.frame_count = int(frame_base[-1])
+        return store
+
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> slice:
+        """Row slice covering frames [start, stop)."""
+        stop = self.frame_count if stop is None else min(stop, self.frame_count)
+        return slice(int(self.offsets[start]), int(self.offsets[stop]))
+
+    def detections(self, index: int) -> List[DetectionView]:
+        """Returns __slots__ views of one frame's detections."""
+        views = []
+        for row in range(*self.rows(index, index + 1).indices(self.size)):
+            user_id = int(self.user_id[row])
+            views.append(DetectionView(index, OBJECT_TYPES[int(self.cls[row])],
+                                       tuple(self.bbox[row].tolist()), float(self.confidence[row]),
+                                       None if user_id == NO_USER else user_id))
+        return views
+
+    def frame_dict(self, index: int) -> dict:
+        """Rebuilds the process_video dictionary for one frame (e.g. for JSON responses)."""
+        frame = {"ball": [], "rim": [], "user_id": []}
+        for view in self.detections(index):
+            cls = BALL if view.object_type == "ball" else RIM if view.object_type == "rim" else PLAYER
+            detection = {"bounding_box": list(view.bounding_box), "confidence": view.confidence}
+            if cls == PLAYER:
+                detection = {"user_id": view.user_id, **detection}
+            frame[FRAME_KEYS[cls]].append(detection)
+        return frame
+
+    def to_frames(self) -> List[dict]:
+        return [self.frame_dict(i) for i in range(self.frame_count)]
+
+    def columns(self, start: int = 0, stop: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Views of every column restricted to frames [start, stop)."""
+        rows = self.rows(start, stop)
+        return {name: getattr(self, name)[rows] for name in COLUMNS}
+
+    def nbytes(self) -> int:
+        return sum(getattr(self, name)[:self.size].nbytes for name in COLUMNS) + \
+            self.offsets[:self.frame_count + 1].nbytes
+
+    def save(self, directory: str):
+        """Writes each column as a .npy file so it can later be memory-mapped."""
+        os.makedirs(directory, exist_ok=True)
+        for name in COLUMNS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name)[:self.size])
+        np.save(os.path.join(directory, "offsets.npy"), self.offsets[:self.frame_count + 1])
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "DetectionStore":
+        """Loads a store written by save, memory-mapping the columns by default."""
+        mode = "r" if mmap else None
+        store = cls.__new__(cls)
+        for name in COLUMNS:
+            setattr(store, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode))
+        store.offsets = np.load(os.path.join(directory, "offsets.npy"), mmap_mode=mode)
+        store.size = len(store.frame)
+        store.frame_count = len(store.offsets) - 1
+        return store
@@ -0,0 +1,112 @@
+"""
+Shared plumbing for the on-disk caches (logic/detection_cache.py,
+logic/commentary_cache.py): content keys, atomic writes, LRU eviction by
+last-use mtime, and hit/miss counters kept next to the entries so every
+process sees the same numbers.
+"""
+import os
+import json
+import time
+import fcntl
+import hashlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# (last used, size in bytes, path) of one cache entry.
+Entry = Tuple[float, int, str]
+
+
+def content_key(payload: Dict[str, Any]) -> str:
+    """SHA-256 of a JSON payload; equal payloads always give the same key."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def touch(path: str) -> bool:
+    """Records a use of the entry marked by path; False if it does not exist."""
+    try:
+        os.utime(path)
+        return True
+    except OSError:
+        return False
+
+
+def write_atomic(path: str, data: bytes):
+    """Writes data so that readers only ever see the complete file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+def file_entries(directory: str) -> List[Entry]:
+    """One entry per complete file in directory."""
+    if not os.path.isdir(directory):
+        return []
+    entries = []
+    for item in os.scandir(directory):
+        if item.is_file() and ".tmp-" not in item.name:
+            stat = item.stat()
+            entries.append((stat.st_mtime, stat.st_size, item.path))
+    return entries
+
+
+def dir_entries(directory: str, marker: str) -> List[Entry]:
+    """One entry per subdirectory of directory holding a marker file, whose mtime is the last use."""
+    if not os.path.isdir(directory):
+        return []
+    entries = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        marker_path = os.path.join(path, marker)
+        if os.path.exists(marker_path):
+            entries.append((os.path.getmtime(marker_path), dir_size(path), path))
+    return entries
+
+
+def evict_lru(entries: List[Entry], max_bytes: int, remove: Callable[[str], None],
+              keep_since: Optional[float] = None) -> List[str]:
+    """
+    Removes the least recently used entries until the rest fit in max_bytes.
+    Entries used after keep_since (a time.time() value) are never removed.
+    Returns the removed paths.
+    """
+    total = sum(size for _, size, _ in entries)
+    removed = []
+    for used, size, path in sorted(entries):
+        if total <= max_bytes or (keep_since is not None and used > keep_since):
+            break
+        try:
+            remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed.append(path)
+    return removed
+
+
+def add_counts(path: str, counts: Dict[str, int]):
+    """Adds counts to the JSON counters in path, under a file lock shared by all processes."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            totals = read_counts(path)
+            for name, count in counts.items():
+                totals[name] = totals.get(name, 0) + count
+            totals["updated"] = time.time()
+            write_atomic(path, json.dumps(totals).encode())
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def read_counts(path: str) -> Dict[str, Any]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
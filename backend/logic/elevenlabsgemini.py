@@ -1,39 +1,56 @@
 import os
 import time
+import shutil
+import asyncio
 import dotenv
-from elevenlabs.client import ElevenLabs
-from elevenlabs import play
-from google import genai
-from google.genai import types
-from mutagen.mp3 import MP3  # Used to get audio duration
+from logic import commentary_cache
+from logic.commentary_playback import play_commentary
+from logic.commentary_pipeline import (GEMINI_MAX_OUTPUT_TOKENS, GEMINI_MODEL, GEMINI_TEMPERATURE,
+                                       TTS_MODEL_ID, TTS_OUTPUT_FORMAT, VOICE_ID, commentary_key,
+                                       generate_commentary_segments, speech_key)
+from logic.event_selection import select_events
 
 dotenv.load_dotenv()
 
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-client1 = ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
+# SDK clients for the one-off synchronous calls below, created on first use;
+# generate_and_prepare_commentary goes through the async REST pipeline instead.
+_clients = {}
+
+def gemini_client():
+    if "gemini" not in _clients:
+        from google import genai
+        _clients["gemini"] = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    return _clients["gemini"]
+
+def elevenlabs_client():
+    if "elevenlabs" not in _clients:
+        from elevenlabs.client import ElevenLabs
+        _clients["elevenlabs"] = ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
+    return _clients["elevenlabs"]
 
 
 def generate_commentary_prompt(event):
     """
     Create a prompt for Gemini for a single event.
     """
-    time_str = f"{event['time']:.2f}s"
+    # The event time is left out of the prompt: commentary is spoken at that moment
+    # anyway, and without it recurring events share one cached commentary.
     etype = event["event_type"]
     details = event["details"]
     if etype == "pass":
-        line = (f"At {time_str}, a slick pass is executed from player {details['from']} "
+        line = (f"A slick pass is executed from player {details['from']} "
                 f"to player {details['to']}, igniting the momentum.")
     elif etype == "shot":
-        line = (f"At {time_str}, player {details['possession']} takes a daring shot "
+        line = (f"Player {details['possession']} takes a daring shot "
                 f"that is {details.get('result', 'undecided')}!")
     elif etype == "turnover":
-        line = (f"At {time_str}, player {details['lost_by']} loses control, resulting in a turnover.")
+        line = (f"Player {details['lost_by']} loses control, resulting in a turnover.")
     elif etype == "steal":
-        line = (f"At {time_str}, an electrifying steal by player {details['gained_by']} shifts the tide!")
+        line = (f"An electrifying steal by player {details['gained_by']} shifts the tide!")
     elif etype == "dribble":
-        line = (f"At {time_str}, player {details['player']} displays masterful dribbling skills.")
+        line = (f"Player {details['player']} displays masterful dribbling skills.")
     else:
-        line = f"At {time_str}, an event of type '{etype}' occurs."
+        line = f"An event of type '{etype}' occurs."
     
     prompt = (
         "You are an expert sports commentator known for vivid and punchy commentary. "
@@ -44,17 +61,24 @@ def generate_commentary_prompt(event):
 
 def generate_commentary_for_event(event):
     prompt = generate_commentary_prompt(event)
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
+    key = commentary_key(prompt)
+    cached = commentary_cache.load_text(key)
+    if cached is not None:
+        return cached
+
+    from google.genai import types
+    response = gemini_client().models.generate_content(
+        model=GEMINI_MODEL,
         contents=prompt,
         config=types.GenerateContentConfig(
-            max_output_tokens=50,
-            temperature=0.8
+            max_output_tokens=GEMINI_MAX_OUTPUT_TOKENS,
+            temperature=GEMINI_TEMPERATURE
         )
     )
     # Directly access the 'text' attribute from the response model
     commentary = response.text.strip() if response.text else ""
     if commentary:
+        commentary_cache.save_text(key, commentary, {"prompt": prompt})
         return commentary
     else:
         raise Exception(f"Gemini API returned an empty response for event at {event['time']:.2f}s")
@@ -64,16 +88,24 @@ def text_to_speech_elevenlabs(text, output_filename):
     """
     Convert the provided text to an audio file using the ElevenLabs API.
     """
-    audio_generator = client1.text_to_speech.convert(
+    key = speech_key(text)
+    cached = commentary_cache.load_audio(key)
+    if cached is not None:
+        shutil.copyfile(cached, output_filename)
+        print(f"Audio commentary saved as {output_filename} (cached)")
+        return
+
+    audio_generator = elevenlabs_client().text_to_speech.convert(
         text=text,
-        voice_id="29vD33N1CtxCmqQRPOHJ",
-        model_id="eleven_multilingual_v2",
-        output_format="mp3_44100_128",
+        voice_id=VOICE_ID,
+        model_id=TTS_MODEL_ID,
+        output_format=TTS_OUTPUT_FORMAT,
     )
     # Combine all the audio chunks from the generator into one bytes object
     audio_content = b"".join(audio_generator)
     
     if audio_content:
+        commentary_cache.save_audio(key, audio_content)
         with open(output_filename, "wb") as f:
             f.write(audio_content)
         print(f"Audio commentary saved as {output_filename}")
@@ -82,42 +114,25 @@ def text_to_speech_elevenlabs(text, output_filename):
 
 
 
-def generate_and_prepare_commentary(events):
+def generate_and_prepare_commentary(events, video_duration=None):
     """
-    For each event, generate commentary and corresponding TTS audio.
-    Returns a list of dictionaries with 'time', 'commentary', and 'audio_file'.
+    Generate commentary and corresponding TTS audio for the events worth hearing:
+    bursts are merged, short dribbles dropped and the rest fitted into the
+    airtime by importance (see logic/event_selection.py).
+    Requests for different events run concurrently (see logic/commentary_pipeline.py).
+    Returns a list of dictionaries with 'time', 'commentary', and 'audio_file', in time order.
     """
-    segments = []
-    for i, event in enumerate(events):
-        commentary = generate_commentary_for_event(event)
-        audio_filename = f"commentary_{i}.mp3"
-        text_to_speech_elevenlabs(commentary, output_filename=audio_filename)
-        segments.append({
-            "time": event["time"],
-            "commentary": commentary,
-            "audio_file": audio_filename
-        })
-    return segments
+    return asyncio.run(generate_commentary_segments(select_events(events, end_time=video_duration)))
 
 def schedule_commentary_playback(segments, video_start_time):
     """
-    Schedule playback so each commentary plays at its corresponding video timestamp.
-    Ensures that each audio finishes playing before the next one starts.
+    Schedule playback so each commentary plays at its corresponding video timestamp
+    (video_start_time is a time.time() value). Blocks until playback ends; from
+    async code, await play_commentary instead (see logic/commentary_playback.py).
     """
-    for segment in segments:
-        # Calculate delay until the commentary should start
-        delay = segment["time"] - (time.time() - video_start_time)
-        if delay > 0:
-            time.sleep(delay)
-        
-        # Play the commentary audio
-        play(segment["audio_file"])
-        print(f"Played commentary for event at {segment['time']:.2f}s")
-        
-        # Wait until the audio file has finished playing to avoid overlap
-        audio = MP3(segment["audio_file"])
-        duration = audio.info.length
-        time.sleep(duration)
+    # Convert the wall-clock start to the monotonic clock the scheduler runs on.
+    start = time.monotonic() - (time.time() - video_start_time)
+    return asyncio.run(play_commentary(segments, start))
 
 if __name__ == "__main__":
     
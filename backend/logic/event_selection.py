@@ -0,0 +1,92 @@
+"""
+Chooses which game events get commentary. determine_event_change reports a
+dribble for nearly every window while a player holds the ball, and every
+event costs a Gemini and an ElevenLabs request, yet clips play one at a time,
+so most would never be heard. Selection:
+  1. coalesces bursts: a run of dribbles by one player becomes one event, and
+     repeats of the same event within MERGE_WINDOW seconds collapse into one;
+  2. drops dribbles too short to be worth describing;
+  3. ranks what is left by EVENT_PRIORITY and keeps the highest-ranked events
+     whose clips fit in the airtime, so no clip overlaps another.
+Events are dicts like asdict(GameEvent): {"event_type", "time", "details"}.
+"""
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+# Importance of each event type; unknown types rank lowest.
+EVENT_PRIORITY = {"shot": 1.0, "steal": 0.8, "turnover": 0.7, "pass": 0.5, "dribble": 0.1}
+# Identical events closer together than this (seconds) are one burst.
+MERGE_WINDOW = 1.5
+# Dribbles shorter than this (seconds of held possession) get no commentary.
+MIN_DRIBBLE_SECONDS = 3.0
+# Expected length of one spoken commentary clip, in seconds.
+CLIP_SECONDS = float(os.getenv("COMMENTARY_CLIP_SECONDS", "6.0"))
+# Silence kept between consecutive clips.
+CLIP_GAP = 0.5
+
+
+def _same_event(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    return a["event_type"] == b["event_type"] and a["details"] == b["details"]
+
+
+def coalesce_events(events: List[Dict[str, Any]], merge_window: float = MERGE_WINDOW) -> List[Dict[str, Any]]:
+    """
+    Merges bursts into their first event, in time order. Merged events get
+    "duration" (seconds from first to last) and "count" (events merged).
+    """
+    merged: List[Dict[str, Any]] = []
+    for event in sorted(events, key=lambda e: e["time"]):
+        last = merged[-1] if merged else None
+        if last is not None and _same_event(last, event):
+            end = last["time"] + last["duration"]
+            # Consecutive dribbles by one player are one spell of possession however long it lasts.
+            if event["event_type"] == "dribble" or event["time"] - end <= merge_window:
+                last["duration"] = event["time"] - last["time"]
+                last["count"] += 1
+                continue
+        merged.append({**event, "duration": 0.0, "count": 1})
+    return merged
+
+
+def drop_low_value(events: List[Dict[str, Any]], min_dribble_seconds: float = MIN_DRIBBLE_SECONDS
+                   ) -> List[Dict[str, Any]]:
+    return [event for event in events
+            if event["event_type"] != "dribble" or event["duration"] >= min_dribble_seconds]
+
+
+def event_priority(event: Dict[str, Any]) -> float:
+    return EVENT_PRIORITY.get(event["event_type"], 0.0)
+
+
+def fit_to_airtime(events: List[Dict[str, Any]],
+                   clip_seconds: float = CLIP_SECONDS,
+                   gap: float = CLIP_GAP,
+                   end_time: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Greedily keeps the most important events (earliest first among equals)
+    whose clips, each clip_seconds long from the event time, overlap no clip
+    already kept. Events after end_time (e.g. the video length) are dropped.
+    Returns the kept events in time order.
+    """
+    kept: List[Tuple[float, float]] = []
+    selected = []
+    for event in sorted(events, key=lambda e: (-event_priority(e), e["time"])):
+        start = event["time"]
+        if end_time is not None and start >= end_time:
+            continue
+        end = start + clip_seconds + gap
+        if all(end <= s or start >= e for s, e in kept):
+            kept.append((start, end))
+            selected.append(event)
+    return sorted(selected, key=lambda e: e["time"])
+
+
+def select_events(events: List[Dict[str, Any]],
+                  clip_seconds: float = CLIP_SECONDS,
+                  end_time: Optional[float] = None) -> List[Dict[str, Any]]:
+    """The events worth commentary, in time order."""
+    candidates = drop_low_value(coalesce_events(events))
+    selected = fit_to_airtime(candidates, clip_seconds, end_time=end_time)
+    print(f"Selected {len(selected)} of {len(events)} events for commentary "
+          f"({len(candidates)} after coalescing)")
+    return selected
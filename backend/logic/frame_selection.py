@@ -0,0 +1,94 @@
+import cv2
+import numpy as np
+from typing import List, Optional, Tuple
+
+# Side of the grayscale thumbnail used to measure motion between frames.
+MOTION_THUMBNAIL_SIZE = 32
+# Frames whose hashes differ in at most this many bits are near-duplicates.
+MIN_HASH_DISTANCE = 6
+
+
+def dhash(frame: np.ndarray, hash_size: int = 8) -> int:
+    """64-bit difference hash: near-identical frames get hashes a few bits apart."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def motion_thumbnail(frame: np.ndarray) -> np.ndarray:
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.resize(gray, (MOTION_THUMBNAIL_SIZE, MOTION_THUMBNAIL_SIZE),
+                      interpolation=cv2.INTER_AREA).astype(np.int16)
+
+
+def motion_score(a: np.ndarray, b: np.ndarray) -> float:
+    """Mean absolute difference between two motion thumbnails (0-255)."""
+    return float(np.abs(a - b).mean())
+
+
+class FrameSelector:
+    """
+    Picks a compact, diverse subset of a clip's frames for the training dataset.
+
+    A frame is kept only if it moved enough since the last kept frame (motion
+    keyframes), its perceptual hash is not within min_hash_distance bits of any
+    kept frame (near-duplicate removal), and the budget is not used up.
+    """
+    def __init__(self, budget: Optional[int] = None, min_hash_distance: int = MIN_HASH_DISTANCE,
+                 min_motion: float = 2.0):
+        self.budget = budget
+        self.min_hash_distance = min_hash_distance
+        self.min_motion = min_motion
+        self.kept_hashes: List[int] = []
+        self.last_thumbnail: Optional[np.ndarray] = None
+        self.seen = 0
+
+    def full(self) -> bool:
+        return self.budget is not None and len(self.kept_hashes) >= self.budget
+
+    def accept(self, frame: np.ndarray) -> bool:
+        """Returns True if frame should be written to the dataset."""
+        self.seen += 1
+        if self.full():
+            return False
+        thumbnail = motion_thumbnail(frame)
+        if self.last_thumbnail is not None and motion_score(thumbnail, self.last_thumbnail) < self.min_motion:
+            return False
+        frame_hash = dhash(frame)
+        if any(hamming(frame_hash, kept) <= self.min_hash_distance for kept in self.kept_hashes):
+            return False
+        self.kept_hashes.append(frame_hash)
+        self.last_thumbnail = thumbnail
+        return True
+
+
+def select_frames(candidates: List[Tuple[int, int]], budget: Optional[int] = None,
+                  min_hash_distance: int = MIN_HASH_DISTANCE) -> List[int]:
+    """
+    Final pick over a clip's (frame_id, dhash) candidates, gathered from all
+    of its chunks: drops near-duplicates of earlier candidates, then keeps at
+    most budget of the rest, spread evenly over the clip. Returns frame ids in order.
+    """
+    kept: List[Tuple[int, int]] = []
+    for frame_id, frame_hash in sorted(candidates):
+        if all(hamming(frame_hash, kept_hash) > min_hash_distance for _, kept_hash in kept):
+            kept.append((frame_id, frame_hash))
+    if budget and len(kept) > budget:
+        step = len(kept) / budget
+        kept = [kept[int(i * step)] for i in range(budget)]
+    return [frame_id for frame_id, _ in kept]
+
+
+def sample_stride(frame_count: int, budget: Optional[int], oversample: int = 3) -> int:
+    """
+    Step between candidate frames so that about oversample * budget frames of a
+    clip are looked at; the rest are skipped without being decoded.
+    """
+    if not budget or frame_count <= 0:
+        return 1
+    return max(1, frame_count // (budget * oversample))
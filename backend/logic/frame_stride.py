@@ -0,0 +1,131 @@
+import threading
+import numpy as np
+from typing import Dict, List, Optional
+
+from logic.spatial import near_matrix
+
+
+class StridePolicy:
+    """
+    Decides how many frames the decoder advances between frames sent to the models.
+
+    With adaptive off every stride-th frame is detected. With adaptive on the
+    policy watches each detected frame: it drops to full rate while the ball is
+    near a rim or near more than one player (a contested ball), uses stride
+    while the ball is in play, and skips up to max_stride frames while no ball
+    is visible (dead play).
+
+    The decoder runs ahead of the detections the policy observes, so with
+    lookahead set, next_stride blocks while more than lookahead decoded frames
+    have not been observed yet. That keeps the stride current: otherwise the
+    decoder would still be skipping at max_stride through a whole pipeline's
+    worth of frames after the ball reaches a rim.
+    """
+    def __init__(self, stride: int = 1, adaptive: bool = False, max_stride: Optional[int] = None,
+                 lookahead: Optional[int] = None):
+        self.stride = max(int(stride), 1)
+        self.adaptive = adaptive
+        self.max_stride = max(int(max_stride or 4 * self.stride), self.stride)
+        self.current = 1 if adaptive else self.stride
+        self.lookahead = lookahead
+        self.issued = 0
+        self.observed = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def next_stride(self) -> int:
+        """Called by the decoder after each detected frame."""
+        with self._cond:
+            self.issued += 1
+            if self.lookahead is not None:
+                while not self.closed and self.issued - self.observed > self.lookahead:
+                    self._cond.wait(0.1)
+            return self.current
+
+    def observe(self, frame: dict):
+        """Updates the stride from the detections of the latest detected frame."""
+        with self._cond:
+            self.observed += 1
+            if self.adaptive:
+                activity = frame_activity(frame)
+                if activity == "hot":
+                    self.current = 1
+                elif activity == "live":
+                    self.current = self.stride
+                else:
+                    self.current = self.max_stride
+            self._cond.notify_all()
+
+    def close(self):
+        """Releases a decoder waiting in next_stride (the consumer has stopped)."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def describe(self) -> Dict[str, object]:
+        """Settings that change detection output; part of the detection cache key."""
+        return {"stride": self.stride, "adaptive": self.adaptive, "max_stride": self.max_stride,
+                "lookahead": self.lookahead}
+
+
+def _boxes(detections: List[dict]) -> np.ndarray:
+    return np.array([d["bounding_box"] for d in detections], dtype=np.float64).reshape(-1, 4)
+
+
+def frame_activity(frame: dict) -> str:
+    """
+    Classifies a frame as "hot" (ball near a rim or contested), "live" (ball in
+    play) or "dead" (no ball detected).
+    """
+    balls = _boxes(frame.get("ball", []))
+    if len(balls) == 0:
+        return "dead"
+    rims = _boxes(frame.get("rim", []))
+    if len(rims) and near_matrix(balls, rims).any():
+        return "hot"
+    players = _boxes(frame.get("user_id", []))
+    if len(players) and (near_matrix(balls, players).sum(axis=1) > 1).any():
+        return "hot"
+    return "live"
+
+
+def _lerp_box(a: List[float], b: List[float], t: float) -> List[float]:
+    return [x + (y - x) * t for x, y in zip(a, b)]
+
+
+def _interpolate_list(a: List[dict], b: List[dict], t: float) -> List[dict]:
+    """Interpolates detections paired by position; falls back to the nearest keyframe."""
+    if len(a) != len(b):
+        return [dict(d) for d in (a if t < 0.5 else b)]
+    nearest = a if t < 0.5 else b
+    return [{**n, "bounding_box": _lerp_box(x["bounding_box"], y["bounding_box"], t)}
+            for x, y, n in zip(a, b, nearest)]
+
+
+def _interpolate_players(a: List[dict], b: List[dict], t: float) -> List[dict]:
+    """Interpolates players present in both keyframes, matched by user_id."""
+    later = {p.get("user_id"): p for p in b}
+    nearest = a if t < 0.5 else b
+    players = []
+    for player in nearest:
+        user_id = player.get("user_id")
+        earlier = next((p for p in a if p.get("user_id") == user_id), None)
+        if earlier is not None and user_id in later:
+            box = _lerp_box(earlier["bounding_box"], later[user_id]["bounding_box"], t)
+            players.append({**player, "bounding_box": box})
+        else:
+            players.append(dict(player))
+    return players
+
+
+def interpolate_detections(a: dict, b: dict, t: float) -> dict:
+    """
+    Detections for a skipped frame a fraction t of the way from keyframe a to keyframe b.
+    Boxes are linearly interpolated where they can be matched; otherwise the
+    nearest keyframe's detections are used.
+    """
+    return {
+        "ball": _interpolate_list(a.get("ball", []), b.get("ball", []), t),
+        "rim": _interpolate_list(a.get("rim", []), b.get("rim", []), t),
+        "user_id": _interpolate_players(a.get("user_id", []), b.get("user_id", []), t),
+    }
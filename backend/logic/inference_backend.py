@@ -0,0 +1,230 @@
+"""
+CPU inference backends for the YOLO models.
+
+"pytorch" runs the .pt weights through ultralytics as before. The other
+backends export the weights once (next to the .pt file, redone whenever the
+.pt is newer) and run the exported model through ultralytics' AutoBackend:
+
+    onnx            ONNX Runtime, FP32
+    onnx-int8       ONNX Runtime, dynamically quantized INT8 weights
+    openvino        OpenVINO, FP32
+    openvino-int8   OpenVINO, INT8 (NNCF post-training quantization)
+
+The OpenVINO backends are optional: pip install -r requirements-openvino.txt.
+openvino-int8 calibrates on the images of a dataset yaml (INT8_CALIBRATION_DATA,
+by default the training dataset built from our own game footage) and is refused
+when there is none, rather than letting ultralytics download COCO images.
+
+Export ahead of time from the backend directory:
+    python -m logic.inference_backend runs/detect/person_classifier/weights/best.pt --backend onnx
+"""
+import os
+import shutil
+import argparse
+import tempfile
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+BACKENDS = ("pytorch", "onnx", "onnx-int8", "openvino", "openvino-int8")
+# Backend used by the model registry.
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "pytorch")
+# Threads per model for ONNX Runtime / OpenVINO; 0 leaves the runtime default (all cores).
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0"))
+# Input size of exported models.
+INFERENCE_IMGSZ = 640
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Dataset yaml whose images calibrate openvino-int8 exports.
+INT8_CALIBRATION_DATA = os.getenv("INT8_CALIBRATION_DATA", os.path.join(backend_dir, "dataset", "data.yaml"))
+
+# Exports in progress in this process, by destination path.
+_export_locks: Dict[str, threading.Lock] = {}
+_export_locks_lock = threading.Lock()
+
+
+def init_worker_threads(threads: int):
+    """
+    Process pool initializer for model workers: caps this process's torch,
+    ONNX Runtime / OpenVINO and OpenCV thread pools so that the workers
+    together do not oversubscribe the cores.
+    """
+    import cv2
+    import torch
+    global INFERENCE_THREADS
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(1)
+    INFERENCE_THREADS = INFERENCE_THREADS or threads
+
+
+def load_yolo(path: str):
+    """Loads YOLO weights. ultralytics (and torch) are only imported on first use."""
+    from ultralytics import YOLO
+    return YOLO(path)
+
+
+def exported_path(weights_path: str, backend: str) -> str:
+    """Where the export of weights_path for backend lives."""
+    stem = os.path.splitext(os.path.abspath(weights_path))[0]
+    return {
+        "onnx": f"{stem}.onnx",
+        "onnx-int8": f"{stem}.int8.onnx",
+        # ultralytics recognises OpenVINO models by the _openvino_model suffix.
+        "openvino": f"{stem}_openvino_model",
+        "openvino-int8": f"{stem}_int8_openvino_model",
+    }[backend]
+
+
+def _is_fresh(exported: str, weights_path: str) -> bool:
+    if not os.path.exists(exported):
+        return False
+    if not os.path.exists(weights_path):
+        return True
+    return os.stat(exported).st_mtime_ns >= os.stat(weights_path).st_mtime_ns
+
+
+def _replace(src: str, dest: str):
+    """Moves a file or directory over dest, so readers never see a partial export."""
+    if os.path.isdir(src) and os.path.exists(dest):
+        old = f"{dest}.old-{os.getpid()}"
+        os.replace(dest, old)
+        os.replace(src, dest)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.replace(src, dest)
+
+
+def quantize_onnx(src: str, dest: str):
+    """INT8 weights for an ONNX model, keeping the metadata ultralytics reads (names, stride, imgsz)."""
+    import onnx
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(src, dest, weight_type=QuantType.QUInt8)
+    fp32, int8 = onnx.load(src), onnx.load(dest)
+    int8.metadata_props.extend(fp32.metadata_props)
+    onnx.save(int8, dest)
+
+
+def require_backend(backend: str):
+    """
+    Fails early if an optional backend's packages (or openvino-int8's
+    calibration data) are missing, rather than letting ultralytics try to
+    pip-install (or download) them at export time.
+    """
+    if not backend.startswith("openvino"):
+        return
+    try:
+        import openvino  # noqa: F401
+        if backend == "openvino-int8":
+            import nncf  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError(f"The {backend} backend needs the optional OpenVINO packages: "
+                           "pip install -r requirements-openvino.txt") from e
+    if backend == "openvino-int8" and not os.path.exists(INT8_CALIBRATION_DATA):
+        raise RuntimeError(f"The {backend} backend calibrates on our own frames, but {INT8_CALIBRATION_DATA} "
+                           "does not exist: build the training dataset or set INT8_CALIBRATION_DATA")
+
+
+def export_model(weights_path: str, backend: str) -> str:
+    """
+    Exports weights_path for backend unless an up-to-date export exists, and
+    returns the exported path. The export is built in a temporary directory
+    and moved into place, so concurrent workers can share it.
+    """
+    require_backend(backend)
+    dest = exported_path(weights_path, backend)
+    with _export_locks_lock:
+        lock = _export_locks.setdefault(dest, threading.Lock())
+    with lock:
+        if _is_fresh(dest, weights_path):
+            return dest
+        print(f"Exporting {weights_path} for the {backend} backend")
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(dest)) as tmp:
+            if os.path.exists(weights_path):
+                src = os.path.join(tmp, os.path.basename(weights_path))
+                shutil.copy2(weights_path, src)
+                model = load_yolo(src)
+            else:
+                # A model name ultralytics downloads itself, e.g. yolov8n.pt.
+                model = load_yolo(weights_path)
+                src = os.path.join(tmp, os.path.basename(weights_path))
+                shutil.copy2(model.ckpt_path, src)
+                model = load_yolo(src)
+            if backend.startswith("onnx"):
+                exported = model.export(format="onnx", dynamic=True, simplify=True, imgsz=INFERENCE_IMGSZ)
+                if backend == "onnx-int8":
+                    quantized = os.path.join(tmp, os.path.basename(dest))
+                    quantize_onnx(exported, quantized)
+                    exported = quantized
+            elif backend == "openvino-int8":
+                exported = model.export(format="openvino", dynamic=True, imgsz=INFERENCE_IMGSZ,
+                                        int8=True, data=INT8_CALIBRATION_DATA)
+            else:
+                exported = model.export(format="openvino", dynamic=True, imgsz=INFERENCE_IMGSZ)
+            _replace(exported, dest)
+    return dest
+
+
+def _onnx_session(path: str, threads: int):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.inter_op_num_threads = 1
+    if threads:
+        options.intra_op_num_threads = threads
+    return ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+
+def _openvino_model(path: str, inference_mode: str, threads: int):
+    import openvino as ov
+
+    core = ov.Core()
+    xml = next(name for name in os.listdir(path) if name.endswith(".xml"))
+    ov_model = core.read_model(os.path.join(path, xml))
+    if ov_model.get_parameters()[0].get_layout().empty:
+        ov_model.get_parameters()[0].set_layout(ov.Layout("NCHW"))
+    config = {"PERFORMANCE_HINT": inference_mode}
+    if threads:
+        config["INFERENCE_NUM_THREADS"] = threads
+    return core.compile_model(ov_model, device_name="CPU", config=config)
+
+
+def load_model(weights_path: str, backend: str = INFERENCE_BACKEND, threads: Optional[int] = None):
+    """
+    Loads weights_path for inference on backend. Returns an ultralytics YOLO
+    object either way, so callers do not depend on the backend.
+    threads defaults to INFERENCE_THREADS at the time of the call.
+    """
+    if threads is None:
+        threads = INFERENCE_THREADS
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend!r}; expected one of {BACKENDS}")
+    if backend == "pytorch":
+        return load_yolo(weights_path)
+    path = export_model(weights_path, backend)
+    from ultralytics import YOLO
+    model = YOLO(path, task="detect")
+    # ultralytics builds its runtime session on the first call, with default
+    # settings; make that call now and swap in one with our thread settings.
+    model.predict(np.zeros((INFERENCE_IMGSZ, INFERENCE_IMGSZ, 3), dtype=np.uint8), verbose=False)
+    runtime = model.predictor.model
+    if backend.startswith("onnx"):
+        runtime.session = _onnx_session(path, threads)
+    else:
+        runtime.ov_compiled_model = _openvino_model(path, runtime.inference_mode, threads)
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("weights", nargs="+")
+    parser.add_argument("--backend", choices=BACKENDS[1:], default="onnx")
+    args = parser.parse_args()
+    for weights in args.weights:
+        print(export_model(weights, args.backend))
+
+
+if __name__ == "__main__":
+    main()
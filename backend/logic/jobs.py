@@ -0,0 +1,179 @@
+import os
+import time
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+# Number of jobs (training runs, video analyses) that may run at the same time.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+# Seconds a finished job (and its result) is kept for clients to fetch.
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))
+# Most finished jobs kept at once; the oldest are dropped first.
+MAX_FINISHED_JOBS = int(os.getenv("MAX_FINISHED_JOBS", "50"))
+
+FINISHED = ("succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it has been cancelled."""
+
+
+@dataclass
+class Job:
+    job_id: str
+    kind: str
+    # "queued", "running", "cancelling" (asked to stop, still running), "succeeded", "failed", "cancelled"
+    status: str = "queued"
+    progress: float = 0.0    # Fraction of the work done, 0.0 to 1.0
+    error: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+    future: Optional[Future] = field(default=None, repr=False)
+    cancel_requested: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": round(self.progress, 4),
+            "error": self.error,
+            "created": self.created,
+            "finished": self.finished,
+        }
+
+
+def _run_job(job_id: str, shared, fn: Callable, args: tuple, kwargs: dict):
+    """Entry point in the worker process: runs fn with a progress callback."""
+    shared[job_id] = {"status": "running", "progress": 0.0}
+
+    def report_progress(done: float, total: float):
+        if shared.get(job_id + ":cancel"):
+            raise JobCancelled(job_id)
+        if total:
+            shared[job_id] = {"status": "running", "progress": min(done / total, 1.0)}
+
+    report_progress(0, 0)
+    return fn(*args, progress=report_progress, **kwargs)
+
+
+class JobManager:
+    """
+    Runs blocking work (training, video analysis) in a process pool so request
+    handlers can return a job id right away instead of stalling the event loop.
+    Progress and cancellation flags are shared with the workers through a
+    multiprocessing manager; work functions take a progress(done, total)
+    callback, which raises JobCancelled once the job has been cancelled.
+    Finished jobs and their results are dropped after JOB_RESULT_TTL seconds,
+    or sooner once more than MAX_FINISHED_JOBS have finished.
+    """
+    def __init__(self, max_workers: int = JOB_WORKERS):
+        self.max_workers = max_workers
+        self.jobs: Dict[str, Job] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._shared = None
+
+    def _start(self):
+        # Started lazily so importing the routes does not spawn processes.
+        if self._executor is None:
+            context = multiprocessing.get_context("spawn")
+            self._manager = context.Manager()
+            self._shared = self._manager.dict()
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+
+    def submit(self, kind: str, fn: Callable, *args, **kwargs) -> Job:
+        """Queues fn(*args, progress=..., **kwargs) in the worker pool; fn must be importable."""
+        self._start()
+        self.evict()
+        job = Job(job_id=uuid.uuid4().hex, kind=kind)
+        job.future = self._executor.submit(_run_job, job.job_id, self._shared, fn, args, kwargs)
+        self.jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        if job is not None:
+            self._refresh(job)
+        return job
+
+    def list_jobs(self):
+        self.evict()
+        return [self.get(job_id) for job_id in list(self.jobs)]
+
+    def evict(self, now: Optional[float] = None):
+        """Forgets finished jobs past JOB_RESULT_TTL, and the oldest beyond MAX_FINISHED_JOBS."""
+        now = time.time() if now is None else now
+        finished = []
+        for job in list(self.jobs.values()):
+            self._refresh(job)
+            if job.status in FINISHED:
+                finished.append(job)
+        finished.sort(key=lambda job: job.finished)
+        expired = [job for job in finished if now - job.finished > JOB_RESULT_TTL]
+        expired += [job for job in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)] if job not in expired]
+        for job in expired:
+            del self.jobs[job.job_id]
+            self._shared.pop(job.job_id, None)
+            self._shared.pop(job.job_id + ":cancel", None)
+
+    def _refresh(self, job: Job):
+        if job.status in FINISHED:
+            return
+        future = job.future
+        if future.done():
+            job.finished = time.time()
+            if future.cancelled():
+                job.status = "cancelled"
+                return
+            error = future.exception()
+            if isinstance(error, JobCancelled):
+                job.status = "cancelled"
+            elif error is not None:
+                job.status = "failed"
+                job.error = f"{type(error).__name__}: {error}"
+            else:
+                job.status = "succeeded"
+                job.progress = 1.0
+            return
+        state = self._shared.get(job.job_id)
+        if state is not None:
+            job.status = state["status"]
+            job.progress = state["progress"]
+        if job.cancel_requested:
+            # Until the worker raises JobCancelled at its next progress report.
+            job.status = "cancelling"
+
+    def result(self, job_id: str) -> Any:
+        """Result of a succeeded job (only call once get() reports "succeeded")."""
+        return self.jobs[job_id].future.result()
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancels a queued job, or asks a running one (or one already handed to a
+        worker) to stop at its next progress report; it then reports
+        "cancelling" until it has stopped.
+        """
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED:
+            return False
+        if job.future.cancel():
+            job.status = "cancelled"
+            job.finished = time.time()
+            return True
+        self._shared[job_id + ":cancel"] = True
+        job.cancel_requested = True
+        self._refresh(job)
+        return True
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._manager.shutdown()
+            self._executor = None
+
+
+# Shared by all routes.
+job_manager = JobManager()
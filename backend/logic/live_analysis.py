@@ -0,0 +1,260 @@
+import os
+import time
+import uuid
+import asyncio
+import threading
+from collections import deque
+from dataclasses import asdict
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from logic.predictions_logic import (PlayerStats, SlidingWindowEventDetector, detection_models,
+                                     infer_frame_batch, postprocess_frame_batch)
+from logic.roi import RoiBatch
+from logic.tracking import PlayerTracker
+
+# Frames buffered per session; older frames are dropped when the app sends faster than we analyse.
+LIVE_RING_SIZE = 16
+# Frames older than this (seconds since they arrived) are stale and skipped.
+LIVE_MAX_FRAME_AGE = 0.5
+# Most frames analysed per model call; drops to 1 while over the latency budget.
+LIVE_MAX_BATCH = 4
+# Per-stage latency budgets in milliseconds; "total" is frame arrival to event.
+LIVE_BUDGETS_MS = {"decode": 30.0, "infer": 500.0, "events": 20.0, "total": 1000.0}
+# Recent events kept per session for clients that poll instead of using the WebSocket.
+LIVE_EVENT_HISTORY = 256
+# Seconds without frames or a connected listener after which a session closes itself.
+LIVE_IDLE_TIMEOUT = float(os.getenv("LIVE_IDLE_TIMEOUT", "120"))
+
+
+class FrameRing:
+    """
+    Bounded buffer of encoded frames. put never blocks: a full ring drops its
+    oldest frame. take returns the newest frames and discards everything older,
+    so analysis always works on what is happening now.
+    """
+    def __init__(self, capacity: int = LIVE_RING_SIZE):
+        self.frames: Deque[Tuple[float, bytes]] = deque(maxlen=capacity)
+        self.dropped = 0
+        self.received = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def put(self, data: bytes, received: Optional[float] = None):
+        with self._cond:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1
+            self.frames.append((received if received is not None else time.monotonic(), data))
+            self.received += 1
+            self._cond.notify()
+
+    def take(self, max_frames: int, max_age: float = LIVE_MAX_FRAME_AGE,
+             timeout: float = 0.1) -> List[Tuple[float, bytes]]:
+        """Newest (arrival time, data) frames, oldest first; waits up to timeout for one."""
+        with self._cond:
+            if not self.frames and not self.closed:
+                self._cond.wait(timeout)
+            now = time.monotonic()
+            fresh = [frame for frame in self.frames if now - frame[0] <= max_age]
+            taken = fresh[-max_frames:]
+            self.dropped += len(self.frames) - len(taken)
+            self.frames.clear()
+            return taken
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class LatencyStats:
+    """Running per-stage latencies (ms) checked against LIVE_BUDGETS_MS."""
+    def __init__(self, budgets: Dict[str, float] = LIVE_BUDGETS_MS):
+        self.budgets = budgets
+        self.last: Dict[str, float] = {}
+        self.mean: Dict[str, float] = {}
+        self.over_budget: Dict[str, int] = {stage: 0 for stage in budgets}
+
+    def record(self, stage: str, ms: float):
+        self.last[stage] = ms
+        # Exponential moving average, so the numbers follow current conditions.
+        self.mean[stage] = ms if stage not in self.mean else 0.9 * self.mean[stage] + 0.1 * ms
+        if ms > self.budgets.get(stage, float("inf")):
+            self.over_budget[stage] += 1
+
+    def over(self, stage: str) -> bool:
+        return self.mean.get(stage, 0.0) > self.budgets.get(stage, float("inf"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"last_ms": {k: round(v, 1) for k, v in self.last.items()},
+                "mean_ms": {k: round(v, 1) for k, v in self.mean.items()},
+                "budget_ms": self.budgets, "over_budget": self.over_budget}
+
+
+class LiveSession:
+    """
+    Live analysis of frames streamed from the app. Frames go into a FrameRing;
+    a worker thread repeatedly takes the newest ones, runs the detectors on
+    them and feeds the incremental event engine, publishing each GameEvent as
+    soon as it is detected. Event times are seconds since the session started.
+    Sessions share the registry's models; each model runs one call at a time
+    (see run_model).
+    Player stats are kept per session. The session closes itself (and leaves
+    live_sessions) when its worker fails or after LIVE_IDLE_TIMEOUT seconds
+    without frames or listeners.
+    """
+    def __init__(self, window_size: int = 10, frame_rate: float = 30.0):
+        self.session_id = uuid.uuid4().hex
+        self.frame_rate = frame_rate
+        self.ring = FrameRing()
+        self.player_stats: Dict[int, PlayerStats] = {}
+        self.detector = SlidingWindowEventDetector(window_size, frame_rate, stats=self.player_stats)
+        self.latency = LatencyStats()
+        self.analysed = 0
+        self.started = time.monotonic()
+        self.last_active = self.started
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=LIVE_EVENT_HISTORY)
+        self.event_count = 0
+        self.error: Optional[str] = None
+        self._listeners: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"live-{self.session_id[:8]}", daemon=True)
+        self._thread.start()
+
+    @property
+    def alive(self) -> bool:
+        return self._thread.is_alive() and not self._stop.is_set()
+
+    def push_frame(self, data: bytes):
+        """Queues one encoded (e.g. JPEG) frame; never blocks."""
+        self.last_active = time.monotonic()
+        self.ring.put(data)
+
+    def idle(self) -> bool:
+        with self._lock:
+            listening = bool(self._listeners)
+        return not listening and time.monotonic() - self.last_active > LIVE_IDLE_TIMEOUT
+
+    def subscribe(self) -> asyncio.Queue:
+        """Queue on the calling event loop that receives every new event message."""
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            self._listeners.append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._listeners = [(loop, q) for loop, q in self._listeners if q is not queue]
+        self.last_active = time.monotonic()
+
+    def events_after(self, seq: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [message for message in self.events if message["seq"] > seq]
+
+    def _publish(self, message: Dict[str, Any]):
+        with self._lock:
+            self.event_count += 1
+            message = {"seq": self.event_count, **message}
+            self.events.append(message)
+            listeners = list(self._listeners)
+        for loop, queue in listeners:
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+
+    def _analyse(self, batch: List[Tuple[float, bytes]], models, tracker: PlayerTracker, roi_batch: RoiBatch):
+        start = time.perf_counter()
+        received, frames = [], []
+        for arrived, data in batch:
+            frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is not None:
+                received.append(arrived)
+                frames.append(frame)
+        decoded = time.perf_counter()
+        self.latency.record("decode", (decoded - start) * 1000)
+        if not frames:
+            return
+
+        detections = postprocess_frame_batch(
+            infer_frame_batch(frames, models=models, roi_batch=roi_batch, tracker=tracker))
+        inferred = time.perf_counter()
+        self.latency.record("infer", (inferred - decoded) * 1000)
+
+        for arrived, frame in zip(received, detections):
+            pushed = time.perf_counter()
+            event = self.detector.push(frame)
+            self.analysed += 1
+            self.latency.record("events", (time.perf_counter() - pushed) * 1000)
+            self.latency.record("total", (time.monotonic() - arrived) * 1000)
+            if event is None:
+                continue
+            event.time = round(arrived - self.started, 3)
+            self._publish({"type": "event", "event": asdict(event), "latency_ms": dict(self.latency.last)})
+
+    def _run(self):
+        try:
+            # One model version and tracker for the whole session.
+            models = detection_models()
+            tracker = PlayerTracker()
+            roi_batch = RoiBatch()
+            while not self._stop.is_set():
+                if self.idle():
+                    self._publish({"type": "closed", "reason": "idle"})
+                    break
+                max_frames = 1 if self.latency.over("total") or self.latency.over("infer") else LIVE_MAX_BATCH
+                batch = self.ring.take(max_frames)
+                if batch:
+                    self._analyse(batch, models, tracker, roi_batch)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self._publish({"type": "error", "error": self.error})
+        finally:
+            # A session whose worker has exited takes no more frames.
+            self._stop.set()
+            self.ring.close()
+            if live_sessions.get(self.session_id) is self:
+                del live_sessions[self.session_id]
+
+    def stop(self):
+        self._stop.set()
+        self.ring.close()
+        self._thread.join(timeout=5)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "received": self.ring.received,
+            "analysed": self.analysed,
+            "dropped": self.ring.dropped,
+            "events": self.event_count,
+            "error": self.error,
+            "alive": self.alive,
+            "latency": self.latency.to_dict(),
+            "player_stats": {pid: asdict(stats) for pid, stats in list(self.player_stats.items())},
+        }
+
+
+# Open live sessions, by id.
+live_sessions: Dict[str, LiveSession] = {}
+
+
+def start_session(window_size: int = 10, frame_rate: float = 30.0) -> LiveSession:
+    session = LiveSession(window_size, frame_rate)
+    live_sessions[session.session_id] = session
+    if not session.alive:
+        # The worker failed before the session was registered.
+        live_sessions.pop(session.session_id, None)
+    return session
+
+
+def stop_session(session_id: str) -> Optional[LiveSession]:
+    session = live_sessions.pop(session_id, None)
+    if session is not None:
+        session.stop()
+    return session
+
+
+def stop_all_sessions():
+    for session_id in list(live_sessions):
+        stop_session(session_id)
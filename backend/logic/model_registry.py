@@ -0,0 +1,135 @@
+import os
+import shutil
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from logic.inference_backend import INFERENCE_BACKEND, load_model
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Weights written by train_model_logic.
+PERSON_CLASSIFIER_WEIGHTS = os.getenv(
+    "CLASSIFIER_WEIGHTS",
+    os.path.join(backend_dir, "runs", "detect", "person_classifier", "weights", "best.pt"))
+# General ball / person / rim detector.
+DETECTOR_WEIGHTS = os.getenv("DETECTOR_WEIGHTS", os.path.join(backend_dir, "best.pt"))
+# Pretrained base model, used for auto-labeling and as the starting point for training.
+BASE_WEIGHTS = "yolov8n.pt"
+
+MODEL_PATHS = {
+    "person_classifier": PERSON_CLASSIFIER_WEIGHTS,
+    "detector": DETECTOR_WEIGHTS,
+    "base": BASE_WEIGHTS,
+}
+
+# Model versions kept in memory across all names; the least recently used go first.
+MAX_LOADED_MODELS = int(os.getenv("MAX_LOADED_MODELS", "4"))
+
+
+# Inference locks, by model object. Ultralytics predictors keep state between
+# the stages of a call, so one model object must only run one call at a time.
+_inference_locks: "weakref.WeakKeyDictionary[Any, threading.Lock]" = weakref.WeakKeyDictionary()
+_inference_locks_lock = threading.Lock()
+
+
+def run_model(model, *args, **kwargs):
+    """
+    Calls model(*args, **kwargs) holding that model's inference lock, so threads
+    sharing a registry model (live sessions, /test_model/) never call it at once.
+    """
+    with _inference_locks_lock:
+        lock = _inference_locks.get(model)
+        if lock is None:
+            lock = _inference_locks[model] = threading.Lock()
+    with lock:
+        return model(*args, **kwargs)
+
+
+def install_weights(src: str, dest: str):
+    """
+    Copies a weights file into place atomically, so a process picking up the
+    new modification time never reads a half-written file.
+    """
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp_path = f"{dest}.tmp"
+    shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dest)
+
+
+class ModelRegistry:
+    """
+    Lazily loaded, shared models looked up by name.
+
+    A model is loaded the first time it is requested and then shared by every
+    caller in the process. Each loaded version is keyed by its weights path,
+    modification time and inference backend, so weights rewritten on disk (e.g.
+    by a training job in another process) are picked up on the next get();
+    publish() swaps in new weights directly. Old versions stay usable by whoever
+    still holds them and are dropped from memory in LRU order.
+    """
+    def __init__(self, paths: Dict[str, str], max_loaded: int = MAX_LOADED_MODELS,
+                 backend: str = INFERENCE_BACKEND, loader=load_model):
+        self._paths = dict(paths)
+        self.backend = backend
+        self._max_loaded = max(max_loaded, 1)
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._load_locks: Dict[Tuple, threading.Lock] = {}
+        self._loaded: "OrderedDict[Tuple, Any]" = OrderedDict()
+
+    def path(self, name: str) -> str:
+        return self._paths[name]
+
+    def _version(self, name: str, path: Optional[str] = None) -> Tuple[str, str, Optional[int], str]:
+        path = path or self._paths[name]
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            # Not on disk (e.g. a model name ultralytics downloads itself).
+            mtime = None
+        return name, path, mtime, self.backend
+
+    def _load_version(self, version: Tuple[str, str, Optional[int], str]):
+        with self._lock:
+            if version in self._loaded:
+                self._loaded.move_to_end(version)
+                return self._loaded[version]
+            load_lock = self._load_locks.setdefault(version, threading.Lock())
+        # Load outside the registry lock so other models stay available meanwhile;
+        # the per-version lock makes concurrent callers share one load.
+        with load_lock:
+            with self._lock:
+                if version in self._loaded:
+                    return self._loaded[version]
+            print(f"Loading model '{version[0]}' from {version[1]} ({version[3]})")
+            model = self._loader(version[1], version[3])
+            with self._lock:
+                self._loaded[version] = model
+                self._load_locks.pop(version, None)
+                while len(self._loaded) > self._max_loaded:
+                    evicted, _ = self._loaded.popitem(last=False)
+                    print(f"Unloaded model '{evicted[0]}' from {evicted[1]}")
+            return model
+
+    def get(self, name: str):
+        """Returns the current version of a model, loading it if needed."""
+        return self._load_version(self._version(name))
+
+    def version(self, name: str) -> Tuple[str, str, Optional[int], str]:
+        """Identifies the version get(name) would return right now."""
+        return self._version(name)
+
+    def publish(self, name: str, path: str):
+        """
+        Loads new weights for name and makes them the current version. Callers
+        keep getting the previous version until the new one is fully loaded.
+        """
+        self._load_version(self._version(name, path))
+        with self._lock:
+            self._paths[name] = path
+
+
+# Shared by the prediction and training modules.
+registry = ModelRegistry(MODEL_PATHS)
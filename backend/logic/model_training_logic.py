@@ -2,8 +2,14 @@ import os
 import random
 import cv2
 import yaml
-from ultralytics import YOLO
 import shutil
+import re
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import List, Optional
+from logic.frame_selection import FrameSelector, sample_stride, select_frames
+from logic.model_registry import BASE_WEIGHTS, PERSON_CLASSIFIER_WEIGHTS, install_weights, registry, run_model
+from logic.inference_backend import init_worker_threads, load_yolo
 
 # Define directories and create necessary folders
 
@@ -15,6 +21,15 @@ backend_dir = os.path.dirname(current_file_dir)
 # Now join with "uploads"
 UPLOAD_DIR = os.path.join(backend_dir, "uploads")
 DATASET_DIR = os.path.join(backend_dir, "dataset")
+DATA_YAML = os.path.join(DATASET_DIR, "data.yaml")
+# Where training writes the person classifier. Its best weights are copied to
+# PERSON_CLASSIFIER_WEIGHTS (which predictions load) only once training is done.
+PERSON_CLASSIFIER_DIR = os.path.join(backend_dir, "runs", "detect", "person_classifier_run")
+
+# Incremental training: epochs of fine-tuning, and frames of each existing
+# player mixed in with the new players' frames.
+INCREMENTAL_EPOCHS = 3
+REPLAY_FRAMES_PER_PLAYER = 50
 
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
@@ -22,9 +37,6 @@ print("UPLOAD_DIR =", UPLOAD_DIR)
 
 print("DATASET_DIR =", DATASET_DIR)
 
-# Load the YOLO model once so it can be reused
-yolo_model = YOLO("yolov8n.pt")
-
 from pymediainfo import MediaInfo
 
 def get_video_rotation(video_path):
@@ -35,53 +47,215 @@ def get_video_rotation(video_path):
             return int(float(track.rotation))  # Convert to float first, then cast to int
     return 0  # Default to no rotation
 
-def extract_frames(video_path: str, person_id: int, person_name: str):
-    cap = cv2.VideoCapture(video_path)
-    frame_id = 0
+# Frames per chunk of a video handed to one dataset worker process.
+EXTRACT_CHUNK_FRAMES = 300
+# Chosen frames written and labeled per dataset task.
+WRITE_CHUNK_FRAMES = 64
+# Frames labeled by the YOLO model per call.
+LABEL_BATCH_SIZE = 16
+# Threads per worker that JPEG-encode and write frames.
+ENCODE_WORKERS = 4
+# Frames kept per player clip after deduplication; 0 keeps every distinct frame.
+FRAMES_PER_PLAYER = int(os.getenv("FRAMES_PER_PLAYER", "300"))
+# Dataset worker processes; defaults to one per core.
+DATASET_WORKERS = int(os.getenv("DATASET_WORKERS", str(os.cpu_count() or 1)))
+
+def rotate_frame(frame, rotation: int):
+    """Rotates a frame according to the video's rotation metadata."""
+    if rotation == 90:
+        return cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE)
+    elif rotation == 180:
+        return cv2.rotate(frame, cv2.ROTATE_180)
+    elif rotation == 270:
+        return cv2.rotate(frame, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    return frame
 
-    rotation = get_video_rotation(video_path)
+def write_labels(label_path: str, result, person_id: int, width: int, height: int):
+    """Writes the person boxes of one YOLO result as YOLO-format labels for person_id."""
+    detections = result.boxes
+    if len(detections) > 0:
+        with open(label_path, "w") as f:
+            for box in detections:
+                cls = int(box.cls.item())
+                if cls == 0:
+                    x_min, y_min, x_max, y_max = box.xyxy[0].tolist()
+                    x_center = ((x_min + x_max) / 2) / width
+                    y_center = ((y_min + y_max) / 2) / height
+                    norm_width = (x_max - x_min) / width
+                    norm_height = (y_max - y_min) / height
+                    f.write(f"{person_id} {x_center} {y_center} {norm_width} {norm_height}\n")
 
-    while cap.isOpened():
+def label_batch(batch, person_id: int, encoder: ThreadPoolExecutor):
+    """
+    Saves a batch of (frame_id, image path, label path, frame) entries: frames are
+    JPEG-encoded on the encoder threads while one YOLO call labels the whole batch.
+    """
+    writes = [encoder.submit(cv2.imwrite, image_path, frame) for _, image_path, _, frame in batch]
+    results = run_model(registry.get("base"), [frame for _, _, _, frame in batch])
+    for (_, _, label_path, frame), result in zip(batch, results):
+        height, width, _ = frame.shape
+        write_labels(label_path, result, person_id, width, height)
+    for write in writes:
+        write.result()
+
+def scan_frame_range(video_path: str, start: int = 0, stop: Optional[int] = None, stride: int = 1):
+    """
+    Finds the candidate frames in [start, stop) of a video: every stride-th
+    frame that passes a FrameSelector (motion keyframes, near-duplicate removal
+    within the range). Returns (frames scanned, [(frame_id, dhash)]).
+    """
+    cap = cv2.VideoCapture(video_path)
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    selector = FrameSelector()
+    frame_id = start
+    candidates = []
+    while cap.isOpened() and (stop is None or frame_id < stop):
+        if (frame_id - start) % stride:
+            # Not a candidate: advance without decoding the frame.
+            if not cap.grab():
+                break
+            frame_id += 1
+            continue
         ret, frame = cap.read()
         if not ret:
             break
-
-        # Automatically rotate frames if needed
-        if rotation == 90:
-            frame = cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE)
-        elif rotation == 180:
-            frame = cv2.rotate(frame, cv2.ROTATE_180)
-        elif rotation == 270:
-            frame = cv2.rotate(frame, cv2.ROTATE_90_COUNTERCLOCKWISE)
-
-        # Randomly select a dataset split
-        dataset_split = random.choices(["train", "test", "valid"], [0.7, 0.15, 0.15])[0]
-        image_filename = f"{person_name}_frame_{frame_id}.jpg"
-        label_filename = f"{person_name}_frame_{frame_id}.txt"
-        image_path = f"{DATASET_DIR}/{dataset_split}/images/{image_filename}"
-        label_path = f"{DATASET_DIR}/{dataset_split}/labels/{label_filename}"
-
-        # Save the frame as an image
-        cv2.imwrite(image_path, frame)
-
-        # Run YOLO detection on the frame
-        height, width, _ = frame.shape
-        results = yolo_model(frame)
-        detections = results[0].boxes
-
-        if len(detections) > 0:
-            with open(label_path, "w") as f:
-                for box in detections:
-                    cls = int(box.cls.item())
-                    if cls == 0:
-                        x_min, y_min, x_max, y_max = box.xyxy[0].tolist()
-                        x_center = ((x_min + x_max) / 2) / width
-                        y_center = ((y_min + y_max) / 2) / height
-                        norm_width = (x_max - x_min) / width
-                        norm_height = (y_max - y_min) / height
-                        f.write(f"{person_id} {x_center} {y_center} {norm_width} {norm_height}\n")
+        if selector.accept(frame):
+            candidates.append((frame_id, selector.kept_hashes[-1]))
         frame_id += 1
     cap.release()
+    return frame_id - start, candidates
+
+def write_frames(video_path: str, person_id: int, person_name: str, frame_ids: List[int],
+                 rotation: Optional[int] = None) -> int:
+    """Decodes, labels and writes the given frames (ascending ids) of a video into the dataset."""
+    if not frame_ids:
+        return 0
+    if rotation is None:
+        rotation = get_video_rotation(video_path)
+    cap = cv2.VideoCapture(video_path)
+    if frame_ids[0]:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_ids[0])
+    frame_id = frame_ids[0]
+    written = 0
+    batch = []
+    
+    with ThreadPoolExecutor(max_workers=ENCODE_WORKERS) as encoder:
+        for target in frame_ids:
+            # Advance to the next chosen frame without decoding the ones in between.
+            while frame_id < target and cap.grab():
+                frame_id += 1
+            ret, frame = cap.read() if frame_id == target else (False, None)
+            if not ret:
+                break
+            frame_id += 1
+            
+            # Automatically rotate frames if needed
+            frame = rotate_frame(frame, rotation)
+            
+            # Randomly select a dataset split
+            dataset_split = random.choices(["train", "test", "valid"], [0.7, 0.15, 0.15])[0]
+            image_filename = f"{person_name}_frame_{target}.jpg"
+            label_filename = f"{person_name}_frame_{target}.txt"
+            image_path = f"{DATASET_DIR}/{dataset_split}/images/{image_filename}"
+            label_path = f"{DATASET_DIR}/{dataset_split}/labels/{label_filename}"
+            batch.append((target, image_path, label_path, frame))
+            written += 1
+            
+            if len(batch) >= LABEL_BATCH_SIZE:
+                label_batch(batch, person_id, encoder)
+                batch = []
+        
+        if batch:
+            label_batch(batch, person_id, encoder)
+    cap.release()
+    return written
+
+def extract_frame_range(video_path: str, person_id: int, person_name: str,
+                        start: int = 0, stop: Optional[int] = None, rotation: Optional[int] = None,
+                        budget: Optional[int] = None, stride: int = 1):
+    """
+    Extracts and labels frames [start, stop) of a video into the dataset, in
+    this process: scan_frame_range, then select_frames, then write_frames.
+    Returns (frames scanned, frames written).
+    """
+    scanned, candidates = scan_frame_range(video_path, start, stop, stride)
+    return scanned, write_frames(video_path, person_id, person_name, select_frames(candidates, budget), rotation)
+
+def extract_frames(video_path: str, person_id: int, person_name: str):
+    extract_frame_range(video_path, person_id, person_name)
+
+def _run_tasks(pool, fn, tasks, on_result):
+    """Runs fn(*task) for every task on pool, calling on_result(task, result) as each finishes."""
+    futures = {pool.submit(fn, *task): task for task in tasks}
+    try:
+        for future in as_completed(futures):
+            on_result(futures[future], future.result())
+    except BaseException:
+        # Don't start the remaining tasks after a failure or cancellation.
+        for future in futures:
+            future.cancel()
+        raise
+
+def extract_videos_parallel(jobs, progress=None, workers: int = DATASET_WORKERS):
+    """
+    Fans (video_path, person_id, person_name) jobs out over a process pool in
+    two passes. First every EXTRACT_CHUNK_FRAMES-frame chunk of each video is
+    scanned for candidate frames. Near-duplicates are then removed across the
+    whole video and its FRAMES_PER_PLAYER budget applied (select_frames), so a
+    player standing still yields one frame, not one per chunk. Finally the
+    chosen frames are written and labeled, WRITE_CHUNK_FRAMES per task.
+    progress, if given, is called as progress(done, total), the scan and the
+    writes each counting for half.
+    """
+    videos = {}
+    scans = []
+    total_frames = 0
+    for video_path, person_id, person_name in jobs:
+        cap = cv2.VideoCapture(video_path)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        total_frames += frame_count
+        budget = FRAMES_PER_PLAYER or None
+        videos[video_path] = (person_id, person_name, get_video_rotation(video_path), budget, [])
+        stride = sample_stride(frame_count, budget)
+        for start in range(0, max(frame_count, 1), EXTRACT_CHUNK_FRAMES):
+            # The last chunk runs to the end, in case the frame count is an estimate.
+            stop = start + EXTRACT_CHUNK_FRAMES if start + EXTRACT_CHUNK_FRAMES < frame_count else None
+            scans.append((video_path, start, stop, stride))
+    total_frames = max(total_frames, 1)
+    
+    scanned = 0
+    written = 0
+    workers = max(1, min(workers, len(scans)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=init_worker_threads, initargs=(threads,)) as pool:
+        def on_scan(task, result):
+            nonlocal scanned
+            scanned += result[0]
+            videos[task[0]][4].extend(result[1])
+            print(f"Scanned {scanned}/{total_frames} frames")
+            if progress is not None:
+                progress(min(scanned, total_frames), 2 * total_frames)
+        _run_tasks(pool, scan_frame_range, scans, on_scan)
+        
+        writes = []
+        for video_path, (person_id, person_name, rotation, budget, candidates) in videos.items():
+            frame_ids = select_frames(candidates, budget)
+            for i in range(0, len(frame_ids), WRITE_CHUNK_FRAMES):
+                writes.append((video_path, person_id, person_name, frame_ids[i:i + WRITE_CHUNK_FRAMES], rotation))
+        to_write = max(sum(len(task[3]) for task in writes), 1)
+        
+        def on_write(task, kept):
+            nonlocal written
+            written += kept
+            print(f"Kept {written}/{to_write} frames")
+            if progress is not None:
+                progress(total_frames + total_frames * written / to_write, 2 * total_frames)
+        _run_tasks(pool, write_frames, writes, on_write)
+    return written
 
 # def process_video_upload(video_path: str, player_names: str):
     # # Use the number of folders/files in DATASET_DIR as a proxy for person_id
@@ -96,10 +270,28 @@ def extract_frames(video_path: str, person_id: int, person_name: str):
     
     # person_id = len(os.listdir(DATASET_DIR))
     # extract_frames(video_path, person_id)
-def process_videos(video_folder: str):
+def read_data_yaml():
+    """Returns the current dataset configuration, or None if there is none yet."""
+    if not os.path.exists(DATA_YAML):
+        return None
+    with open(DATA_YAML) as f:
+        return yaml.safe_load(f)
+
+def process_videos(video_folder: str, progress=None, incremental: bool = False):
+    """
+    Builds the dataset from the player videos in video_folder and returns the
+    names of the players that were extracted. In incremental mode players
+    already in data.yaml keep their class ids and extracted frames; new
+    players' videos are appended as new classes, and a player whose video was
+    uploaded again has their frames replaced under the same class id.
+    Otherwise the dataset is rebuilt from scratch, as class ids are assigned
+    from video_folder alone.
+    """
     videos = [f for f in os.listdir(video_folder) if f.endswith(('.mp4', '.avi', '.mov'))]
-    nc = len(videos)
-    names = [os.path.splitext(video)[0] for video in videos]
+    existing = read_data_yaml() if incremental else None
+    names = list(existing['names']) if existing else []
+    names += [os.path.splitext(video)[0] for video in videos if os.path.splitext(video)[0] not in names]
+    nc = len(names)
     data_yaml = {
         'names': names,
         'nc': nc,
@@ -107,36 +299,157 @@ def process_videos(video_folder: str):
         'val': './valid',
         'test': './test',
     }
-    with open('dataset/data.yaml', 'w') as f:
+    if incremental:
+        ensure_dataset_dirs()
+        # The upload folder is cleared after every training, so these were uploaded again since.
+        for video in videos:
+            remove_player_frames(os.path.splitext(video)[0])
+    else:
+        # Frames left by an earlier incremental upload would keep labels for old class ids.
+        reset_dataset_dir()
+    with open(DATA_YAML, 'w') as f:
         yaml.dump(data_yaml, f, default_flow_style=False)
     
-    for person_id, video in enumerate(videos):
-        video_path = os.path.join(video_folder, video)
-        extract_frames(video_path, person_id, names[person_id])
+    # Every video is split into frame chunks that are extracted and labeled in parallel.
+    jobs = []
+    for video in videos:
+        name = os.path.splitext(video)[0]
+        jobs.append((os.path.join(video_folder, video), names.index(name), name))
+    extract_videos_parallel(jobs, progress=progress)
     print("all videos processed and labeled correctly")
-    
+    return [name for _, _, name in jobs]
+
+def player_images(split: str, name: str):
+    """Dataset image paths of one player in one split."""
+    pattern = re.compile(rf"^{re.escape(name)}_frame_\d+\.jpg$")
+    images_dir = os.path.join(DATASET_DIR, split, "images")
+    return sorted(os.path.join(images_dir, f) for f in os.listdir(images_dir) if pattern.match(f))
+
+def remove_player_frames(name: str):
+    """Deletes every extracted frame (image and label) of one player."""
+    for split in ("train", "valid", "test"):
+        for image_path in player_images(split, name):
+            label_path = os.path.join(DATASET_DIR, split, "labels",
+                                      os.path.splitext(os.path.basename(image_path))[0] + ".txt")
+            for path in (image_path, label_path):
+                if os.path.exists(path):
+                    os.unlink(path)
 
-def train_model_logic():
-    # Read the player names to configure class names for training
-    # with open(f"{DATASET_DIR}/player_names.txt", "r") as f:
-    #     names = [line.strip() for line in f.readlines()]
+def write_incremental_data_yaml(new_players: List[str]) -> str:
+    """
+    Dataset configuration for fine-tuning on new players: all of their frames
+    plus up to REPLAY_FRAMES_PER_PLAYER frames of every existing player, so the
+    model does not forget them. Returns the path of the written yaml.
+    """
+    data = read_data_yaml()
+    lists = {}
+    for split in ("train", "valid"):
+        images = []
+        for name in data['names']:
+            player = player_images(split, name)
+            if name not in new_players and len(player) > REPLAY_FRAMES_PER_PLAYER:
+                player = random.sample(player, REPLAY_FRAMES_PER_PLAYER)
+            images += player
+        lists[split] = os.path.join(DATASET_DIR, f"incremental_{split}.txt")
+        with open(lists[split], "w") as f:
+            f.write("\n".join(images) + "\n")
+    path = os.path.join(DATASET_DIR, "incremental.yaml")
+    with open(path, "w") as f:
+        yaml.dump({**data, 'train': lists['train'], 'val': lists['valid']}, f, default_flow_style=False)
+    return path
+
+def keep_class_rows(old_model, old_nc: int):
+    """
+    on_pretrain_routine_start callback for fine-tuning old_model with more
+    classes. Ultralytics drops the weights of the class head's final convs
+    when their shape changes, which would leave the existing players to be
+    relearned from the replay frames alone; this copies their rows back in.
+    """
+    import torch
+    rows = [(branch[-1].weight.detach().clone(), branch[-1].bias.detach().clone())
+            for branch in old_model.model.model[-1].cv3]
     
-    # data_yaml = {
-    #     'train': './train',
-    #     'val': './valid',
-    #     'test': './test',
-    #     'nc': len(names),
-    #     'names': names
-    # }
+    def copy_rows(trainer):
+        head = trainer.model.model[-1]
+        if any(branch[-1].weight.shape[1:] != weight.shape[1:] for branch, (weight, _) in zip(head.cv3, rows)):
+            # The hidden width of the class head grows with nc past 64 classes.
+            print("Class head changed shape; existing players are relearned from the replay frames")
+            return
+        with torch.no_grad():
+            for branch, (weight, bias) in zip(head.cv3, rows):
+                branch[-1].weight[:old_nc] = weight
+                branch[-1].bias[:old_nc] = bias
+    return copy_rows
+
+def evaluate_players(weights_path: str, players: List[str]) -> Optional[float]:
+    """mAP50 of the classifier at weights_path on the validation frames of players, or None if they have none."""
+    data = read_data_yaml()
+    images = [image for name in players for image in player_images("valid", name)]
+    if not images:
+        return None
+    images_list = os.path.join(DATASET_DIR, "evaluate_valid.txt")
+    with open(images_list, "w") as f:
+        f.write("\n".join(images) + "\n")
+    path = os.path.join(DATASET_DIR, "evaluate.yaml")
+    with open(path, "w") as f:
+        yaml.dump({**data, 'train': images_list, 'val': images_list}, f, default_flow_style=False)
+    metrics = load_yolo(weights_path).val(data=path, imgsz=640, plots=False, verbose=False)
+    return float(metrics.box.map50)
+
+def train_model_logic(progress=None, new_players: Optional[List[str]] = None):
+    """
+    Trains the person classifier and exports it to CoreML. When new_players is
+    given and a trained classifier exists, fine-tunes that classifier for
+    INCREMENTAL_EPOCHS on the new players (plus a replay sample of the others)
+    instead of training the whole roster from yolov8n.pt. The existing players
+    keep their class-head weights, and their validation mAP50 before and after
+    fine-tuning is returned ({"before", "after"}) so a regression is visible;
+    None for full training.
+    """
+    incremental = bool(new_players) and os.path.exists(PERSON_CLASSIFIER_WEIGHTS)
+    check = None
+    callbacks = []
+    if incremental:
+        model = load_yolo(PERSON_CLASSIFIER_WEIGHTS)
+        data = write_incremental_data_yaml(new_players)
+        epochs = INCREMENTAL_EPOCHS
+        old_players = [name for name in model.names.values() if name not in new_players]
+        check = {"before": evaluate_players(PERSON_CLASSIFIER_WEIGHTS, old_players)}
+        callbacks.append(("on_pretrain_routine_start", keep_class_rows(model, len(model.names))))
+        print(f"Fine-tuning person classifier on new players: {new_players}")
+    else:
+        if new_players:
+            print("No trained person classifier yet; training every player from the base model")
+        # A fresh copy: training modifies the model in place.
+        model = load_yolo(BASE_WEIGHTS)
+        data = DATA_YAML
+        epochs = 10
     
-    # with open(f"{DATASET_DIR}/data.yaml", 'w') as f:
-    #     yaml.dump(data_yaml, f, default_flow_style=False)
+    def report_epoch(trainer):
+        # Raising from here (when the job is cancelled) stops training.
+        if progress is not None:
+            progress(trainer.epoch + 1, trainer.epochs)
     
     # Train the model with the generated dataset configuration
-    yolo_model.train(data=f"{DATASET_DIR}/data.yaml", epochs=10, imgsz=640, name="person_classifier")
+    callbacks.append(("on_train_epoch_end", report_epoch))
+    for event, callback in callbacks:
+        model.add_callback(event, callback)
+    try:
+        model.train(data=data, epochs=epochs, imgsz=640, project=os.path.dirname(PERSON_CLASSIFIER_DIR),
+                    name=os.path.basename(PERSON_CLASSIFIER_DIR), exist_ok=True)
+    finally:
+        for event, callback in callbacks:
+            model.callbacks[event].remove(callback)
+    
+    # Hot-swap the new classifier in; other processes pick it up on their next lookup.
+    install_weights(os.path.join(PERSON_CLASSIFIER_DIR, "weights", "best.pt"), PERSON_CLASSIFIER_WEIGHTS)
+    registry.publish("person_classifier", PERSON_CLASSIFIER_WEIGHTS)
+    if check is not None:
+        check["after"] = evaluate_players(PERSON_CLASSIFIER_WEIGHTS, old_players)
+        print(f"Existing players' mAP50 before / after fine-tuning: {check['before']} / {check['after']}")
     
     # Export the trained model to CoreML format
-    model_coreml = yolo_model.export(format="coreml")
+    model_coreml = model.export(format="coreml")
     # model_coreml.save("person_classifier.mlmodel")
     
     
@@ -153,9 +466,26 @@ def train_model_logic():
                 shutil.rmtree(file_path)
         except Exception as e:
             print(f'Failed to delete {file_path}. Reason: {e}')
+    return check
+
+def train_model_job(progress=None, incremental: bool = False):
+    """Background job behind /train_model/: builds the dataset, then trains and exports."""
+    def stage_progress(offset, weight):
+        if progress is None:
+            return None
+        return lambda done, total: progress(offset + weight * done / max(total, 1), 1.0)
+    
+    new_players = process_videos(UPLOAD_DIR, progress=stage_progress(0.0, 0.3), incremental=incremental)
+    if incremental and not new_players:
+        # Nothing was uploaded since the last training; keep the current classifier.
+        return {"message": "No new or re-uploaded players to train.", "new_players": []}
+    check = train_model_logic(progress=stage_progress(0.3, 0.7), new_players=new_players if incremental else None)
+    return {"message": "Model trained and exported to CoreML.", "new_players": new_players,
+            "existing_players_map50": check}
 
 def test_model_logic(image_path: str):
-    results = yolo_model(image_path)
+    # The trained classifier, as last published by train_model_logic.
+    results = run_model(registry.get("person_classifier"), image_path)
     detections = []
     for box in results[0].boxes:
         cls = int(box.cls.item())
@@ -182,8 +512,9 @@ def reset_dataset_dir():
                 shutil.rmtree(file_path)
         except Exception as e:
             print(f'Failed to delete {file_path}. Reason: {e}')
-            
-            
+    ensure_dataset_dirs()
+
+def ensure_dataset_dirs():
     subsets = ['train', 'valid', 'test']
     subfolders = ['images', 'labels']
 
@@ -1,83 +1,504 @@
+import os
 import cv2
 import json
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from fastapi import UploadFile, File
-import torch
 import numpy as np
-import coremltools as ct
-from ultralytics import YOLO
-from PIL import Image
 from dataclasses import dataclass, field, asdict
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable, Iterable, Iterator
+from logic.video_pipeline import run_video_pipeline
+from logic.spatial import frame_states_batch, frame_states_packed, frame_states_store, pack_store, shot_ball_mask
+from logic.detection_store import DetectionStore
+from logic import detection_cache
+from logic.frame_stride import StridePolicy, interpolate_detections
+from logic.model_registry import registry, run_model
+from logic.roi import ROI_HEIGHT, ROI_MARGIN, ROI_WIDTH, RoiBatch, boxes_to_frame
+from logic.tracking import PlayerTracker
+from logic.detection_store import NO_USER
+from logic import inference_backend
+from logic.video_shards import (SHARD_WARMUP_FRAMES, SHARD_WORKERS, decode_start, plan_shards,
+                                probe_keyframes, video_frame_count)
 
 # --- YOLO Detection Setup ---
 
-# Load two YOLO models: one for person classification and one for general object detection.
-model = YOLO('../runs/detect/person_classifier/weights/best.pt')
-yolo_model = YOLO("best.pt")
+# Confidence thresholds for the two models (the ultralytics defaults).
+CLASSIFIER_CONF = 0.25
+DETECTOR_CONF = 0.25
+# What the person classifier sees: "frame" (the whole frame), "roi" (only the
+# person boxes found by the detector, cropped and batched; see logic/roi.py) or
+# "track" (ROI crops, but only for tracks that need identifying; see logic/tracking.py).
+CLASSIFIER_MODE = os.getenv("CLASSIFIER_MODE", "frame")
 
+# Two YOLO models, loaded on first use through the model registry: the person
+# classifier ("person_classifier") and the general object detector ("detector").
+
+def detection_models():
+    """Current (detector, person classifier) pair."""
+    return registry.get("detector"), registry.get("person_classifier")
+
+def detection_weight_paths() -> List[str]:
+    return [registry.path("detector"), registry.path("person_classifier")]
+
+
+# Model invocation counters, reset at the start of every process_video call.
+inference_stats: Dict[str, int] = {"frames": 0, "yolo_model": 0, "model": 0}
+
+def reset_inference_stats():
+    for key in inference_stats:
+        inference_stats[key] = 0
+
+def dedupe_user_detections(detections: List[dict]) -> List[dict]:
+    """Keeps only the most confident detection for each user_id."""
+    best: Dict[int, dict] = {}
+    for detection in detections:
+        current = best.get(detection["user_id"])
+        if current is None or detection["confidence"] > current["confidence"]:
+            best[detection["user_id"]] = detection
+    return list(best.values())
+
+def parse_user_detections(result, transform: Optional[np.ndarray] = None) -> List[dict]:
+    """
+    Converts one person classifier result into de-duplicated user detections.
+    transform maps boxes of an ROI crop back to frame coordinates (see logic/roi.py).
+    """
+    detections = []
+    for box in result.boxes:
+        # Extract bounding box coordinates, confidence, and use class id as user_id.
+        x_min, y_min, x_max, y_max = box.xyxy[0].tolist()
+        if transform is not None:
+            x_min, y_min, x_max, y_max = boxes_to_frame([x_min, y_min, x_max, y_max], transform)[0].tolist()
+        confidence = box.conf[0].item()
+        cls = int(box.cls[0].item())
+        detections.append({
+            "user_id": cls,  # Using class ID as the unique user ID.
+            "bounding_box": [x_min, y_min, x_max, y_max],
+            "confidence": confidence
+        })
+    return dedupe_user_detections(detections)
+
+def parse_frame_detections(result):
+    """
+    Converts one general detector result into a frame detection dictionary.
+    Returns the dictionary and whether a person was detected in the frame.
+    """
+    frame_detections = {"ball": [], "rim": [], "user_id": []}
+    person_detected = False
+    for box in result.boxes:
+        cls = int(box.cls.item())
+        x_min, y_min, x_max, y_max = box.xyxy[0].tolist()
+        confidence = box.conf[0].item()
+        
+        if cls == 1:  # Person detected
+            person_detected = True
+        elif cls == 0:  # Ball detected
+            frame_detections["ball"].append({
+                "bounding_box": [x_min, y_min, x_max, y_max],
+                "confidence": confidence
+            })
+        elif cls == 2:  # Rim detected
+            frame_detections["rim"].append({
+                "bounding_box": [x_min, y_min, x_max, y_max],
+                "confidence": confidence
+            })
+    return frame_detections, person_detected
 
 def process_frame(image: any):
     """Runs YOLO model on an image and predicts user ID."""
     # Convert image from BGR to RGB.
     image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
     # Run inference using the person classifier model.
-    results = model(image)
+    results = run_model(registry.get("person_classifier"), image, conf=CLASSIFIER_CONF)
+    inference_stats["model"] += 1
     detections = []
     for result in results:
-        for box in result.boxes:
-            # Extract bounding box coordinates, confidence, and use class id as user_id.
-            x_min, y_min, x_max, y_max = box.xyxy[0].tolist()
-            confidence = box.conf[0].item()
-            cls = int(box.cls[0].item())
-            detections.append({
-                "user_id": cls,  # Using class ID as the unique user ID.
-                "bounding_box": [x_min, y_min, x_max, y_max],
-                "confidence": confidence
-            })
-    return detections
+        detections.extend(parse_user_detections(result))
+    return dedupe_user_detections(detections)
 
+def person_boxes(result) -> np.ndarray:
+    """(k, 4) xyxy boxes of the people in one detector result."""
+    boxes = result.boxes
+    return boxes.xyxy[boxes.cls == 1].cpu().numpy()
 
-def process_video(video_path: str):
+def classify_rois(model, frames: List[np.ndarray], results, roi_batch: Optional[RoiBatch] = None):
+    """
+    ROI classification: crops every detected person out of the batch, letterboxes
+    the crops to one fixed size and classifies them all in a single call.
+    Returns {frame index: [(classifier result, crop transform), ...]}.
+    """
+    roi_batch = roi_batch or RoiBatch()
+    crops, owners = roi_batch.gather(frames, [person_boxes(result) for result in results])
+    user_results: Dict[int, list] = {}
+    if crops is None:
+        return user_results
+    inference_stats["model"] += 1
+    crop_results = run_model(model, list(crops), conf=CLASSIFIER_CONF, imgsz=(ROI_HEIGHT, ROI_WIDTH))
+    for (i, transform), crop_result in zip(owners, crop_results):
+        user_results.setdefault(i, []).append((crop_result, transform))
+    return user_results
+
+def classify_tracks(model, frames: List[np.ndarray], results, tracker: PlayerTracker,
+                    roi_batch: Optional[RoiBatch] = None) -> Dict[int, List[dict]]:
+    """
+    Tracking mode: associates each frame's person boxes with tracks (in frame
+    order) and classifies crops of only the tracks that need an identity, in
+    one call for the batch. Every person box then takes its track's user_id.
+    Returns {frame index: user detections}.
+    """
+    roi_batch = roi_batch or RoiBatch()
+    frame_tracks = []
+    requests = []
+    request_boxes = []
+    for i, result in enumerate(results):
+        boxes = person_boxes(result)
+        tracks = tracker.update(boxes)
+        frame_boxes = []
+        for track, box in zip(tracks, boxes):
+            # Identities are read after this batch is classified when one is pending.
+            needs_identity = tracker.needs_identity(track)
+            snapshot = None if needs_identity or track.pending else (track.user_id, track.confidence)
+            if needs_identity:
+                track.pending = True
+                requests.append(track)
+                frame_boxes.append(box)
+            frame_tracks.append((i, track, box, snapshot))
+        request_boxes.append(np.asarray(frame_boxes, dtype=np.float64).reshape(-1, 4))
+    
+    crops, owners = roi_batch.gather(frames, request_boxes)
+    if crops is not None:
+        inference_stats["model"] += 1
+        crop_results = run_model(model, list(crops), conf=CLASSIFIER_CONF, imgsz=(ROI_HEIGHT, ROI_WIDTH))
+        for track, (_, transform), crop_result in zip(requests, owners, crop_results):
+            users = parse_user_detections(crop_result, transform)
+            best = max(users, key=lambda user: user["confidence"], default=None)
+            if best is None:
+                tracker.assign(track, NO_USER, 0.0)
+            else:
+                tracker.assign(track, best["user_id"], best["confidence"])
+    
+    tracked: Dict[int, List[dict]] = {i: [] for i in range(len(results))}
+    for i, track, box, snapshot in frame_tracks:
+        user_id, confidence = snapshot or (track.user_id, track.confidence)
+        if user_id != NO_USER:
+            tracked[i].append({"user_id": user_id, "bounding_box": box.tolist(), "confidence": confidence})
+    return {i: dedupe_user_detections(users) for i, users in tracked.items() if users}
+
+def infer_frame_batch(frames: List[np.ndarray], rgb_buffers: Optional[List[np.ndarray]] = None,
+                      models=None, classifier_mode: Optional[str] = None,
+                      roi_batch: Optional[RoiBatch] = None, tracker: Optional[PlayerTracker] = None):
+    """
+    Inference stage: runs both models on a batch of BGR frames, one call per model.
+    Only frames with a person go through the classifier: the whole frame, in
+    "roi" mode only the person crops (see classify_rois), and in "track" mode
+    only crops of tracks that need identifying (see classify_tracks; tracker
+    carries the tracks across batches). RGB copies are written into rgb_buffers
+    (crops into roi_batch) when given, so a pipeline can reuse them between batches.
+    models is a (detector, classifier) pair, by default the current registry versions.
+    Returns (detector results, {frame index: [(classifier result, crop transform or None)]},
+    {frame index: tracked user detections}).
+    """
+    yolo_model, model = models or detection_models()
+    results = run_model(yolo_model, frames, conf=DETECTOR_CONF)
+    inference_stats["frames"] += len(frames)
+    inference_stats["yolo_model"] += 1
+    
+    classifier_mode = classifier_mode or CLASSIFIER_MODE
+    if classifier_mode == "track":
+        return results, {}, classify_tracks(model, frames, results, tracker or PlayerTracker(), roi_batch)
+    if classifier_mode == "roi":
+        return results, classify_rois(model, frames, results, roi_batch), {}
+    
+    person_indices = [i for i, result in enumerate(results) if bool((result.boxes.cls == 1).any())]
+    user_results = {}
+    if person_indices:
+        if rgb_buffers is None:
+            rgb_buffers = []
+        rgb_frames = []
+        for slot, i in enumerate(person_indices):
+            if slot < len(rgb_buffers) and rgb_buffers[slot].shape == frames[i].shape:
+                rgb_frames.append(cv2.cvtColor(frames[i], cv2.COLOR_BGR2RGB, dst=rgb_buffers[slot]))
+            else:
+                rgb = cv2.cvtColor(frames[i], cv2.COLOR_BGR2RGB)
+                if slot < len(rgb_buffers):
+                    rgb_buffers[slot] = rgb
+                else:
+                    rgb_buffers.append(rgb)
+                rgb_frames.append(rgb)
+        inference_stats["model"] += 1
+        user_results = {i: [(result, None)] for i, result in
+                        zip(person_indices, run_model(model, rgb_frames, conf=CLASSIFIER_CONF))}
+    return results, user_results, {}
+
+def postprocess_frame_batch(inferred) -> List[dict]:
+    """
+    Post-processing stage: turns the output of infer_frame_batch into one
+    {"ball", "rim", "user_id"} dictionary per frame, in order.
+    """
+    results, user_results, tracked = inferred
+    frame_results = []
+    for i, result in enumerate(results):
+        frame_detections, _ = parse_frame_detections(result)
+        if i in tracked:
+            frame_detections["user_id"] = tracked[i]
+        elif i in user_results:
+            frame_detections["user_id"] = dedupe_user_detections(
+                [user for result, transform in user_results[i]
+                 for user in parse_user_detections(result, transform)])
+        frame_results.append(frame_detections)
+    return frame_results
+
+def process_frame_batch(frames: List[np.ndarray]) -> List[dict]:
+    """
+    Runs both models on a batch of BGR frames, one call per model.
+    Returns one {"ball", "rim", "user_id"} dictionary per frame, in order.
+    """
+    return postprocess_frame_batch(infer_frame_batch(frames))
+
+
+# Number of decoded frames sent to the models per call.
+DEFAULT_BATCH_SIZE = 8
+# Number of batches each pipeline queue may hold.
+DEFAULT_QUEUE_DEPTH = 4
+# Detected frames the decoder may run ahead of the adaptive stride policy; also
+# caps the batch size in adaptive mode (see StridePolicy).
+ADAPTIVE_LOOKAHEAD = 2
+
+def iter_video_detections(video_path: str,
+                          batch_size: int = DEFAULT_BATCH_SIZE,
+                          queue_depth: int = DEFAULT_QUEUE_DEPTH,
+                          stride: int = 1,
+                          adaptive: bool = False,
+                          progress: Optional[Callable[[int, int], None]] = None,
+                          start_frame: int = 0,
+                          end_frame: Optional[int] = None) -> Iterator[dict]:
+    """
+    Streams frame detection dictionaries for a video as soon as each batch is done.
+    Each dictionary has keys: "ball", "rim", and "user_id".
+    Only frames [start_frame, end_frame) are analysed when given (see detect_video_sharded).
+
+    Decoding, inference and post-processing run as a pipeline (see
+    logic/video_pipeline.py); each model runs once per batch of frames.
+    With stride > 1 or adaptive on, only some frames go through the models (see
+    StridePolicy) and the skipped frames get interpolated detections, so one
+    dictionary is still yielded per frame and frame indices stay correct.
+    In adaptive mode batches are at most ADAPTIVE_LOOKAHEAD frames, so the
+    stride follows the play within a couple of detected frames.
+    progress, if given, is called as progress(frames done, total frames) after each batch.
+    """
+    reset_inference_stats()
+    total_frames = 0
+    if progress is not None:
+        cap = cv2.VideoCapture(video_path)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        total_frames = (min(end_frame, total_frames) if end_frame is not None else total_frames) - start_frame
+    rgb_buffers: List[np.ndarray] = []
+    roi_batch = RoiBatch()
+    tracker = PlayerTracker()
+    # The whole video uses one model version, even if new weights are published meanwhile.
+    models = detection_models()
+    policy = StridePolicy(stride, adaptive, lookahead=ADAPTIVE_LOOKAHEAD if adaptive else None)
+    if adaptive:
+        # Frames waiting in a partly filled batch are not observed yet, so a
+        # larger batch would block the decoder for good.
+        batch_size = min(batch_size, ADAPTIVE_LOOKAHEAD)
+        queue_depth = 1
+    pipeline = run_video_pipeline(
+        video_path,
+        lambda frames: infer_frame_batch(frames, rgb_buffers, models, roi_batch=roi_batch, tracker=tracker),
+        postprocess_frame_batch,
+        batch_size=batch_size,
+        queue_depth=queue_depth,
+        stride=policy.next_stride if (stride > 1 or adaptive) else None,
+        start_frame=start_frame,
+        end_frame=end_frame,
+    )
+    
+    prev_index, prev_frame = start_frame - 1, None
+    reported = start_frame
+    try:
+        while True:
+            try:
+                index, frame = next(pipeline)
+            except StopIteration as end:
+                frame_count = end.value
+                break
+            policy.observe(frame)
+            # Fill the frames skipped since the previous keyframe.
+            for skipped in range(prev_index + 1, index):
+                t = (skipped - prev_index) / (index - prev_index)
+                yield interpolate_detections(prev_frame, frame, t)
+            yield frame
+            prev_index, prev_frame = index, frame
+            if progress is not None and index + 1 - reported >= batch_size:
+                reported = index + 1
+                progress(reported - start_frame, total_frames)
+    finally:
+        # Unblock the decoder before the pipeline joins it.
+        policy.close()
+        pipeline.close()
+    
+    # Trailing skipped frames hold the last keyframe's detections.
+    for _ in range(prev_index + 1, frame_count):
+        yield interpolate_detections(prev_frame, prev_frame, 0.0)
+    
+    frame_count -= start_frame
+    frames = inference_stats["frames"]
+    calls = inference_stats["yolo_model"] + inference_stats["model"]
+    print(f"Processed {frame_count} frames ({frames} through the models) with {calls} model calls "
+          f"({calls / max(frame_count, 1):.2f} per frame)")
+
+def process_video(video_path: str,
+                  batch_size: int = DEFAULT_BATCH_SIZE,
+                  queue_depth: int = DEFAULT_QUEUE_DEPTH,
+                  stride: int = 1,
+                  adaptive: bool = False):
     """
     Processes video, detects ball, rim, and person, and predicts user ID if a person is detected.
     Returns a list of frame detection dictionaries.
     Each dictionary has keys: "ball", "rim", and "user_id".
     """
-    cap = cv2.VideoCapture(video_path)
-    frame_results = []
+    return list(iter_video_detections(video_path, batch_size, queue_depth, stride, adaptive))
+
+def detect_video_store(video_path: str,
+                       batch_size: int = DEFAULT_BATCH_SIZE,
+                       queue_depth: int = DEFAULT_QUEUE_DEPTH,
+                       stride: int = 1,
+                       adaptive: bool = False,
+                       progress: Optional[Callable[[int, int], None]] = None) -> DetectionStore:
+    """
+    Same as process_video, but collects the detections into a columnar
+    DetectionStore instead of keeping a dictionary per frame.
+    """
+    return DetectionStore.from_frames(
+        iter_video_detections(video_path, batch_size, queue_depth, stride, adaptive, progress))
+
+# Seconds between progress reports (and so cancellation checks) while shards run.
+SHARD_POLL_SECONDS = 1.0
+
+# Cancel flag and frame counter of the sharded run a shard worker process belongs to.
+_shard_cancelled = None
+_shard_frames = None
+
+def _init_shard_worker(threads: int, cancelled, frames_done):
+    """Shard pool initializer: thread limits, plus the run's shared cancel flag and frame counter."""
+    global _shard_cancelled, _shard_frames
+    inference_backend.init_worker_threads(threads)
+    _shard_cancelled, _shard_frames = cancelled, frames_done
+
+def _shard_progress() -> Callable[[int, int], None]:
+    """Progress callback for a shard: adds its frames to the run's counter and stops it once cancelled."""
+    reported = [0]
     
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        # Run general detection to find all objects.
-        results = yolo_model(frame)
-        frame_detections = {"ball": [], "rim": [], "user_id": []}
-        
-        for box in results[0].boxes:
-            cls = int(box.cls.item())
-            x_min, y_min, x_max, y_max = box.xyxy[0].tolist()
-            confidence = box.conf[0].item()
-            
-            if cls == 1:  # Person detected
-                user_detections = process_frame(frame)  # Get user details.
-                frame_detections["user_id"].extend(user_detections)
-            elif cls == 0:  # Ball detected
-                frame_detections["ball"].append({
-                    "bounding_box": [x_min, y_min, x_max, y_max],
-                    "confidence": confidence
-                })
-            elif cls == 2:  # Rim detected
-                frame_detections["rim"].append({
-                    "bounding_box": [x_min, y_min, x_max, y_max],
-                    "confidence": confidence
-                })
-        
-        frame_results.append(frame_detections)
+    def progress(done: int, total: int):
+        if _shard_cancelled is not None and _shard_cancelled.is_set():
+            raise RuntimeError("Sharded analysis cancelled")
+        if _shard_frames is not None:
+            with _shard_frames.get_lock():
+                _shard_frames.value += done - reported[0]
+        reported[0] = done
+    return progress
+
+def detect_shard(video_path: str, start: int, stop: Optional[int], first: int,
+                 stride: int = 1, adaptive: bool = False) -> DetectionStore:
+    """
+    Detections for frames [start, stop) of a video, for detect_video_sharded.
+    Analysis begins at frame first (before start) to warm up the tracker and
+    adaptive stride, and runs one stride past stop so the shard's last skipped
+    frames are interpolated as in a serial run; the extra frames are dropped.
+    """
+    end = None if stop is None else stop + (stride if stride > 1 else 0)
+    store = DetectionStore.from_frames(
+        iter_video_detections(video_path, stride=stride, adaptive=adaptive, progress=_shard_progress(),
+                              start_frame=first, end_frame=end))
+    return store.slice_frames(start - first, None if stop is None else stop - first)
+
+def detect_video_sharded(video_path: str,
+                         stride: int = 1,
+                         adaptive: bool = False,
+                         progress: Optional[Callable[[int, int], None]] = None,
+                         workers: int = SHARD_WORKERS) -> DetectionStore:
+    """
+    detect_video_store split over worker processes: the video is cut into
+    keyframe-aligned time shards (see logic/video_shards.py), each shard is
+    decoded and detected in its own process, and the shard stores are merged in
+    frame order. Events are then computed serially over the merged store, so
+    window boundaries are handled exactly as in a serial run.
+    Falls back to detect_video_store for a single worker or a short video.
+    """
+    if workers <= 1:
+        # No need for the keyframe probe, which reads every packet of the file.
+        return detect_video_store(video_path, stride=stride, adaptive=adaptive, progress=progress)
+    probed = probe_keyframes(video_path)
+    frame_count, keyframes = probed if probed else (video_frame_count(video_path), None)
+    align = stride if stride > 1 and not adaptive else 1
+    shards = plan_shards(frame_count, workers, keyframes, align=align)
+    if len(shards) == 1:
+        return detect_video_store(video_path, stride=stride, adaptive=adaptive, progress=progress)
     
-    cap.release()
-    return frame_results
+    tasks = [(video_path, start, stop, decode_start(start, SHARD_WARMUP_FRAMES, keyframes, align),
+              stride, adaptive) for start, stop in shards]
+    print(f"Analysing {video_path} in {len(shards)} shards: {shards}")
+    threads = max(1, (os.cpu_count() or 1) // len(shards))
+    context = multiprocessing.get_context("spawn")
+    stores: List[Optional[DetectionStore]] = [None] * len(tasks)
+    # Shards count the frames they analyse (warm-up included) and stop once cancelled is set.
+    cancelled = context.Event()
+    frames_done = context.Value("q", 0)
+    with ProcessPoolExecutor(max_workers=len(tasks), mp_context=context, initializer=_init_shard_worker,
+                             initargs=(threads, cancelled, frames_done)) as pool:
+        futures = {pool.submit(detect_shard, *task): i for i, task in enumerate(tasks)}
+        try:
+            pending = set(futures)
+            while pending:
+                finished, pending = wait(pending, timeout=SHARD_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stores[futures[future]] = future.result()
+                # Reported every poll, not only per finished shard, so a cancelled job stops promptly.
+                if progress is not None:
+                    progress(min(frames_done.value, frame_count), max(frame_count, 1))
+        except BaseException:
+            cancelled.set()
+            for future in futures:
+                future.cancel()
+            raise
+    return DetectionStore.concat(stores)
+
+def detection_params(stride: int = 1, adaptive: bool = False) -> Dict[str, Any]:
+    """
+    Settings that change detection output; part of the detection cache key.
+    A new setting that affects detections belongs here too.
+    """
+    policy = StridePolicy(stride, adaptive, lookahead=ADAPTIVE_LOOKAHEAD if adaptive else None)
+    return {"detector_conf": DETECTOR_CONF, "classifier_conf": CLASSIFIER_CONF,
+            "backend": registry.backend, "classifier_mode": CLASSIFIER_MODE,
+            # Track mode reads identities once per batch, so batch boundaries matter.
+            "batch_size": DEFAULT_BATCH_SIZE,
+            "roi": {"width": ROI_WIDTH, "height": ROI_HEIGHT, "margin": ROI_MARGIN},
+            "tracker": PlayerTracker().describe(), **policy.describe()}
+
+def detection_cache_key(video_path: str, video_hash: Optional[str] = None,
+                        stride: int = 1, adaptive: bool = False) -> str:
+    video_hash = video_hash or detection_cache.file_sha256(video_path)
+    return detection_cache.cache_key(video_hash, detection_weight_paths(),
+                                     detection_params(stride, adaptive))
+
+def cached_video_store(video_path: str, video_hash: Optional[str] = None,
+                       stride: int = 1, adaptive: bool = False,
+                       progress: Optional[Callable[[int, int], None]] = None,
+                       workers: int = SHARD_WORKERS) -> DetectionStore:
+    """
+    detect_video_sharded backed by the on-disk detection cache: a video already
+    analysed with the same weights and settings is not run through YOLO again.
+    """
+    return detection_cache.get_or_compute(
+        video_path,
+        detection_weight_paths(),
+        detection_params(stride, adaptive),
+        lambda: detect_video_sharded(video_path, stride=stride, adaptive=adaptive, progress=progress,
+                                     workers=workers),
+        video_hash=video_hash,
+    )
 
 # --- Event Generation & Stats Update Code ---
 
@@ -120,10 +541,11 @@ class PlayerStats:
 # Global dictionary to hold ongoing player stats.
 player_stats: Dict[int, PlayerStats] = {}
 
-def get_or_create_player_stats(player_id: int) -> PlayerStats:
-    if player_id not in player_stats:
-        player_stats[player_id] = PlayerStats(player_id=player_id)
-    return player_stats[player_id]
+def get_or_create_player_stats(player_id: int, stats: Optional[Dict[int, PlayerStats]] = None) -> PlayerStats:
+    stats = player_stats if stats is None else stats
+    if player_id not in stats:
+        stats[player_id] = PlayerStats(player_id=player_id)
+    return stats[player_id]
 
 def is_near(box1, box2):
     """Check if two bounding boxes are near using a center-distance method."""
@@ -178,9 +600,9 @@ def detect_shot_results(frame: FrameDetections) -> List[str]:
         shot_results.append("Made" if is_goal(shot_box) else "Missed")
     return shot_results
 
-def get_frame_state(frame: dict) -> Dict[str, Any]:
+def to_frame_detections(frame: dict) -> FrameDetections:
     """
-    Converts a detection dictionary (from process_video) into a simplified state.
+    Converts a detection dictionary (from process_video) into FrameDetections.
     Expected keys: "ball", "rim", and "user_id".
     """
     # Convert ball detections to Detection objects.
@@ -192,8 +614,14 @@ def get_frame_state(frame: dict) -> Dict[str, Any]:
     # Convert player detections.
     players = [Detection("player", BoundingBox(*player["bounding_box"]), player["confidence"], player.get("user_id"))
                for player in frame.get("user_id", [])]
-    detections = FrameDetections(balls=balls, rims=rims, players=players)
-    
+    return FrameDetections(balls=balls, rims=rims, players=players)
+
+def get_frame_state(frame: dict) -> Dict[str, Any]:
+    """
+    Converts a detection dictionary (from process_video) into a simplified state.
+    Expected keys: "ball", "rim", and "user_id".
+    """
+    detections = to_frame_detections(frame)
     possession = determine_possession(detections)
     shot = bool(detect_shots(detections))
     return {"possession": possession, "shot": shot}
@@ -248,77 +676,251 @@ def determine_event_change(prev_state: Dict[str, Any],
         )
     return None
 
-def update_player_stats(event: GameEvent):
+def update_player_stats(event: GameEvent, stats: Optional[Dict[int, PlayerStats]] = None):
     """
-    Updates player statistics based on the detected event.
+    Updates player statistics based on the detected event, in stats
+    (default: the global player_stats).
     """
     if event.event_type == "shot":
         shooter = event.details.get("possession")
         if shooter is not None:
-            ps = get_or_create_player_stats(shooter)
+            ps = get_or_create_player_stats(shooter, stats)
             if event.details.get("result") == "Made":
                 ps.points += 2
     elif event.event_type == "pass":
         passer = event.details.get("from")
         if passer is not None:
-            ps = get_or_create_player_stats(passer)
+            ps = get_or_create_player_stats(passer, stats)
             ps.assists += 1
     elif event.event_type == "turnover":
         player = event.details.get("lost_by")
         if player is not None:
-            ps = get_or_create_player_stats(player)
+            ps = get_or_create_player_stats(player, stats)
             ps.turnovers += 1
     elif event.event_type == "steal":
         player = event.details.get("gained_by")
         if player is not None:
-            ps = get_or_create_player_stats(player)
+            ps = get_or_create_player_stats(player, stats)
             ps.steals += 1
 
-def process_frames_with_sliding_window(frames: List[dict],
+class WindowAggregator:
+    """
+    Incremental equivalent of aggregate_window_state.
+    Keeps the window's shot flags in a ring buffer with a running count of
+    shot-positive frames, so each push is O(1) whatever the window size.
+    """
+    def __init__(self, window_size: int):
+        self.window_size = window_size
+        self.shots = [False] * window_size
+        self.head = 0
+        self.count = 0
+        self.shot_count = 0
+        self.possession: Optional[int] = None
+
+    def push(self, state: Dict[str, Any]):
+        """Adds a frame state, evicting the oldest one once the window is full."""
+        if self.count == self.window_size:
+            self.shot_count -= self.shots[self.head]
+        else:
+            self.count += 1
+        shot = bool(state["shot"])
+        self.shots[self.head] = shot
+        self.shot_count += shot
+        self.head = (self.head + 1) % self.window_size
+        self.possession = state["possession"]
+
+    def is_full(self) -> bool:
+        return self.count == self.window_size
+
+    def state(self) -> Dict[str, Any]:
+        return {"possession": self.possession, "shot": self.shot_count > 0}
+
+class SlidingWindowEventDetector:
+    """
+    Incremental version of the sliding window event algorithm.
+    Frames are pushed one at a time and an event is returned as soon as the
+    window allows, so only window_size frame states are ever held in memory.
+    Events update stats, or the global player_stats when it is None.
+    """
+    def __init__(self, window_size: int = 10, frame_rate: float = 30.0,
+                 stats: Optional[Dict[int, PlayerStats]] = None):
+        self.window_size = window_size
+        self.frame_rate = frame_rate
+        self.stats = stats
+        self.frame_index = -1
+        self.window = WindowAggregator(window_size)
+        self.prev_agg_state: Optional[Dict[str, Any]] = None
+
+    def push(self, frame: dict) -> Optional[GameEvent]:
+        """Consumes the next frame's detections and returns the event it triggers, if any."""
+        return self.push_state(get_frame_state(frame))
+
+    def push_state(self, state: Dict[str, Any]) -> Optional[GameEvent]:
+        """Same as push, for a frame state already computed by get_frame_state."""
+        self.frame_index += 1
+        self.window.push(state)
+        if self.prev_agg_state is None:
+            # Still filling the first window.
+            if self.window.is_full():
+                self.prev_agg_state = self.window.state()
+            return None
+
+        curr_agg_state = self.window.state()
+        event = None
+        if curr_agg_state != self.prev_agg_state:
+            event = determine_event_change(self.prev_agg_state, curr_agg_state,
+                                           frame_index=self.frame_index, frame_rate=self.frame_rate)
+            if event is not None:
+                update_player_stats(event, self.stats)
+        self.prev_agg_state = curr_agg_state
+        return event
+
+# Frames whose states are computed together by the vectorized spatial engine.
+# Small enough that streamed events are not held back noticeably.
+DEFAULT_STATE_CHUNK = 32
+
+def iter_events(frames: Iterable[dict],
+                window_size: int = 10,
+                frame_rate: float = 30.0,
+                chunk_size: int = DEFAULT_STATE_CHUNK) -> Iterator[GameEvent]:
+    """
+    Yields game events from a stream of detection dictionaries as they are detected.
+    Frame states are computed chunk_size frames at a time with logic/spatial.py.
+    """
+    detector = SlidingWindowEventDetector(window_size, frame_rate)
+    chunk: List[dict] = []
+    for frame in frames:
+        chunk.append(frame)
+        if len(chunk) < chunk_size:
+            continue
+        for state in frame_states_batch(chunk):
+            event = detector.push_state(state)
+            if event is not None:
+                yield event
+        chunk = []
+    for state in frame_states_batch(chunk):
+        event = detector.push_state(state)
+        if event is not None:
+            yield event
+
+def iter_store_events(store: DetectionStore,
+                      window_size: int = 10,
+                      frame_rate: float = 30.0,
+                      chunk_size: int = 4096) -> Iterator[GameEvent]:
+    """Yields game events for the frames of a DetectionStore, read straight from its columns."""
+    detector = SlidingWindowEventDetector(window_size, frame_rate)
+    for start in range(0, len(store), chunk_size):
+        for state in frame_states_store(store, start, start + chunk_size):
+            event = detector.push_state(state)
+            if event is not None:
+                yield event
+
+def process_frames_with_sliding_window(frames,
                                        window_size: int = 10,
                                        frame_rate: float = 30.0) -> List[GameEvent]:
     """
-    Processes a list of detection dictionaries (one per frame) using a sliding window.
+    Processes detections (a DetectionStore, or a list of detection dictionaries,
+    one per frame) using a sliding window.
     Generates game events when state changes occur and updates player stats.
     """
-    events: List[GameEvent] = []
-    total_frames = len(frames)
-    if total_frames < window_size:
-        return events
+    if not isinstance(frames, DetectionStore):
+        frames = DetectionStore.from_frames(frames)
+    return list(iter_store_events(frames, window_size, frame_rate))
+
+def store_frame_summaries(store: DetectionStore, chunk_size: int = 4096):
+    """
+    Per-frame possession, shots (ball boxes near a rim) and shot results for a
+    DetectionStore, as determine_possession / detect_shots / detect_shot_results
+    would give them, computed from its columns chunk_size frames at a time.
+    Only frames with a shot build any objects.
+    """
+    possession: List[Optional[int]] = []
+    shots: List[List[dict]] = []
+    shot_results: List[List[str]] = []
+    for start in range(0, len(store), chunk_size):
+        packed = pack_store(store, start, start + chunk_size)
+        possession += [state["possession"] for state in frame_states_packed(packed)]
+        near_rim = shot_ball_mask(packed)
+        chunk_shots: List[List[dict]] = [[] for _ in range(len(near_rim))]
+        chunk_results: List[List[str]] = [[] for _ in range(len(near_rim))]
+        for i in np.flatnonzero(near_rim.any(axis=1)):
+            for box in packed["balls"][i][near_rim[i]].tolist():
+                chunk_shots[i].append(asdict(BoundingBox(*box)))
+                chunk_results[i].append("Made" if is_goal(box) else "Missed")
+        shots += chunk_shots
+        shot_results += chunk_results
+    return possession, shots, shot_results
 
-    window_states = [get_frame_state(frame) for frame in frames[:window_size]]
-    prev_agg_state = aggregate_window_state(window_states)
+def predict_video_job(video_path: str,
+                      video_hash: Optional[str] = None,
+                      window_size: int = 10,
+                      frame_rate: float = 30.0,
+                      progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+    """
+    Background job behind /predict_video/: detections for every frame, per-frame
+    possession, shots and shot results, and the passes found by the event engine.
+    """
+    store = cached_video_store(video_path, video_hash, progress=progress)
+    possession, shots, shot_results = store_frame_summaries(store)
+    events = process_frames_with_sliding_window(store, window_size, frame_rate)
     
-    for i in range(window_size, total_frames):
-        window_states.pop(0)
-        window_states.append(get_frame_state(frames[i]))
-        curr_agg_state = aggregate_window_state(window_states)
-       
-        if curr_agg_state != prev_agg_state:
-            event = determine_event_change(prev_agg_state, curr_agg_state, frame_index=i, frame_rate=frame_rate)
-            if event is not None:
-                events.append(event)
-                update_player_stats(event)
-        prev_agg_state = curr_agg_state
+    return {
+        "detections": store.to_frames(),
+        "possession": possession,
+        "passes": [asdict(event) for event in events if event.event_type == "pass"],
+        "shots": shots,
+        "shot_results": shot_results,
+        "events": [asdict(event) for event in events],
+    }
 
-    return events
+def record_frames(frames: Iterable[dict], store: DetectionStore) -> Iterator[dict]:
+    """Passes frames through unchanged while appending each one to store."""
+    for frame in frames:
+        store.append_frame(frame)
+        yield frame
 
 def process_video_and_generate_events(video_path: str,
                                       window_size: int = 10,
                                       frame_rate: float = 30.0,
-                                      output_json_path: str = "../game_results.json"):
+                                      output_json_path: str = "../game_results.json",
+                                      video_hash: Optional[str] = None,
+                                      stride: int = 1,
+                                      adaptive: bool = False,
+                                      workers: int = SHARD_WORKERS):
     """
     Unified function that:
-      1. Processes the video using YOLO to get detection data.
-      2. Uses a sliding window algorithm to generate game events.
+      1. Streams detection data for the video from YOLO (split over workers
+         processes when workers > 1), or reads it from the detection cache.
+      2. Feeds each frame to the sliding window algorithm to generate game events.
       3. Updates player statistics.
       4. Stores the resulting events and stats as JSON.
     """
-    # Step 1: Run detection on the video.
-    frames_json = process_video(video_path)
+    key = detection_cache_key(video_path, video_hash, stride, adaptive)
+    store = detection_cache.load(key)
+    cache_hit = store is not None
+    if cache_hit:
+        print(f"Detection cache hit for {video_path}")
+        event_stream = iter_store_events(store, window_size, frame_rate)
+    elif workers > 1:
+        store = detect_video_sharded(video_path, stride=stride, adaptive=adaptive, workers=workers)
+        event_stream = iter_store_events(store, window_size, frame_rate)
+    else:
+        # Detections are consumed as they are produced, so events stream out
+        # while the video is still being analysed; the compact store is cached.
+        store = DetectionStore()
+        detections = iter_video_detections(video_path, stride=stride, adaptive=adaptive)
+        event_stream = iter_events(record_frames(detections, store),
+                                   window_size, frame_rate)
+    
+    # Steps 1-3
+    events = []
+    for event in event_stream:
+        print(f"{event.time:.2f}s: {event.event_type} {event.details}")
+        events.append(event)
     
-    # Step 2: Process frames with a sliding window to generate events.
-    events = process_frames_with_sliding_window(frames_json, window_size, frame_rate)
+    if not cache_hit:
+        detection_cache.save(key, store, {"video": os.path.basename(video_path),
+                                          "params": detection_params(stride, adaptive)})
     
     # Serialize events and player stats.
     events_serialized = [asdict(event) for event in events]
@@ -329,7 +931,7 @@ def process_video_and_generate_events(video_path: str,
         "player_stats": player_stats_serialized
     }
     
-    # Step 3: Write the JSON output.
+    # Step 4: Write the JSON output.
     with open(output_json_path, "w") as f:
         json.dump(output, f, indent=4)
     
@@ -0,0 +1,95 @@
+import cv2
+import numpy as np
+from typing import List, Optional, Tuple
+
+# Size (width, height) every person crop is letterboxed to; people are about
+# twice as tall as wide. Both are multiples of the YOLO stride (32).
+ROI_WIDTH = 128
+ROI_HEIGHT = 256
+# Extra context around each person box, as a fraction of its width/height.
+ROI_MARGIN = 0.1
+# Padding colour of the letterbox (the ultralytics default).
+ROI_PAD_VALUE = 114
+
+
+def expand_boxes(boxes: np.ndarray, width: int, height: int, margin: float = ROI_MARGIN) -> np.ndarray:
+    """Grows (n, 4) xyxy boxes by margin on every side and clips them to the frame (integer pixels)."""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    pad = np.stack([boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]], axis=1) * margin
+    out = np.concatenate([boxes[:, :2] - pad, boxes[:, 2:] + pad], axis=1)
+    out = np.rint(out).astype(np.int64)
+    out[:, [0, 2]] = np.clip(out[:, [0, 2]], 0, width)
+    out[:, [1, 3]] = np.clip(out[:, [1, 3]], 0, height)
+    # Keep at least one pixel, even for degenerate boxes on the frame edge.
+    out[:, 0] = np.minimum(out[:, 0], width - 1)
+    out[:, 1] = np.minimum(out[:, 1], height - 1)
+    out[:, 2] = np.maximum(out[:, 2], out[:, 0] + 1)
+    out[:, 3] = np.maximum(out[:, 3], out[:, 1] + 1)
+    return out
+
+
+def crop_rois(frame: np.ndarray, boxes: np.ndarray, out: np.ndarray,
+              margin: float = ROI_MARGIN) -> np.ndarray:
+    """
+    Crops each person box (plus margin) out of frame and letterboxes it into
+    the matching slot of out, an (n, ROI_HEIGHT, ROI_WIDTH, 3) array, converting
+    BGR to RGB on the way. Returns an (n, 3) array of (scale, x offset, y offset)
+    such that frame = letterboxed / scale + offset.
+    """
+    height, width = frame.shape[:2]
+    regions = expand_boxes(boxes, width, height, margin)
+    transforms = np.zeros((len(regions), 3), dtype=np.float64)
+    out_height, out_width = out.shape[1:3]
+    for i, (x0, y0, x1, y1) in enumerate(regions):
+        slot = out[i]
+        slot[:] = ROI_PAD_VALUE
+        w, h = max(x1 - x0, 1), max(y1 - y0, 1)
+        scale = min(out_width / w, out_height / h)
+        new_w = min(max(int(round(w * scale)), 1), out_width)
+        new_h = min(max(int(round(h * scale)), 1), out_height)
+        left, top = (out_width - new_w) // 2, (out_height - new_h) // 2
+        crop = frame[y0:y0 + h, x0:x0 + w]
+        resized = cv2.resize(crop, (new_w, new_h), interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+        cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=slot[top:top + new_h, left:left + new_w])
+        transforms[i] = (scale, x0 - left / scale, y0 - top / scale)
+    return transforms
+
+
+def boxes_to_frame(boxes: np.ndarray, transform: np.ndarray) -> np.ndarray:
+    """Maps (n, 4) xyxy boxes in a letterboxed crop back to frame coordinates."""
+    scale, x_offset, y_offset = transform
+    return np.asarray(boxes, dtype=np.float64).reshape(-1, 4) / scale + [x_offset, y_offset, x_offset, y_offset]
+
+
+class RoiBatch:
+    """
+    Reusable crop buffer: gathers the person crops of a batch of frames into one
+    fixed-size array so the classifier runs once on all of them.
+    """
+    def __init__(self, width: int = ROI_WIDTH, height: int = ROI_HEIGHT):
+        self.width = width
+        self.height = height
+        self.buffer = np.empty((0, height, width, 3), dtype=np.uint8)
+
+    def gather(self, frames: List[np.ndarray], boxes: List[np.ndarray]
+               ) -> Tuple[Optional[np.ndarray], List[Tuple[int, np.ndarray]]]:
+        """
+        boxes[i] holds the (k, 4) person boxes of frames[i]. Returns the crops
+        (None if there are none) and, per crop, (frame index, transform).
+        """
+        total = sum(len(b) for b in boxes)
+        if total == 0:
+            return None, []
+        if len(self.buffer) < total:
+            self.buffer = np.empty((total, self.height, self.width, 3), dtype=np.uint8)
+        crops = self.buffer[:total]
+        owners = []
+        start = 0
+        for i, (frame, frame_boxes) in enumerate(zip(frames, boxes)):
+            if len(frame_boxes) == 0:
+                continue
+            stop = start + len(frame_boxes)
+            transforms = crop_rois(frame, frame_boxes, crops[start:stop])
+            owners.extend((i, transform) for transform in transforms)
+            start = stop
+        return crops, owners
@@ -0,0 +1,162 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple, Any
+from logic.detection_store import BALL, PLAYER, RIM, NO_USER, DetectionStore
+
+# Center distance (in pixels) under which two boxes count as near, as in is_near.
+NEAR_DISTANCE = 50
+
+
+def box_centers(boxes: np.ndarray) -> np.ndarray:
+    """Returns the (x, y) centers of an (..., 4) array of [x_min, y_min, x_max, y_max] boxes."""
+    return np.stack(((boxes[..., 0] + boxes[..., 2]) / 2,
+                     (boxes[..., 1] + boxes[..., 3]) / 2), axis=-1)
+
+
+def near_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Broadcasted is_near over every pair of boxes.
+    boxes_a is (..., A, 4) and boxes_b is (..., B, 4); the result is an (..., A, B) bool array.
+    """
+    centers_a = box_centers(boxes_a)[..., :, None, :]
+    centers_b = box_centers(boxes_b)[..., None, :, :]
+    dx = centers_a[..., 0] - centers_b[..., 0]
+    dy = centers_a[..., 1] - centers_b[..., 1]
+    return np.sqrt(dx ** 2 + dy ** 2) < NEAR_DISTANCE
+
+
+def pack_boxes(frames: List[dict], key: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Packs one detection type from a list of frame dictionaries into a padded
+    (frames, max detections, 4) box array and a matching validity mask.
+    Also returns the (frame, slot) index of every packed detection.
+    """
+    counts = np.fromiter((len(frame.get(key, ())) for frame in frames), dtype=np.int64, count=len(frames))
+    width = int(counts.max()) if len(frames) else 0
+    boxes = np.zeros((len(frames), width, 4), dtype=np.float64)
+    mask = np.arange(width) < counts[:, None]
+    rows, slots = np.nonzero(mask)
+    if len(rows):
+        flat = [d["bounding_box"] for frame in frames for d in frame.get(key, ())]
+        boxes[rows, slots] = np.array(flat, dtype=np.float64)
+    return boxes, mask, rows, slots
+
+
+def pack_frames(frames: List[dict]) -> Dict[str, np.ndarray]:
+    """Packs frame detection dictionaries (from process_video) into padded arrays."""
+    balls, ball_mask, _, _ = pack_boxes(frames, "ball")
+    rims, rim_mask, _, _ = pack_boxes(frames, "rim")
+    players, player_mask, rows, slots = pack_boxes(frames, "user_id")
+    player_ids = np.full(player_mask.shape, NO_USER, dtype=np.int64)
+    if len(rows):
+        ids = [p.get("user_id") for frame in frames for p in frame.get("user_id", ())]
+        player_ids[rows, slots] = [NO_USER if user_id is None else user_id for user_id in ids]
+    return {
+        "balls": balls, "ball_mask": ball_mask,
+        "rims": rims, "rim_mask": rim_mask,
+        "players": players, "player_mask": player_mask, "player_ids": player_ids,
+    }
+
+
+def pad_sorted(frame_index: np.ndarray, values: np.ndarray, n_frames: int,
+               fill=0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Scatters per-detection values, sorted by frame_index, into a padded
+    (n_frames, max detections per frame, ...) array plus a validity mask.
+    """
+    if len(frame_index) == 0:
+        return (np.full((n_frames, 0) + values.shape[1:], fill, dtype=values.dtype),
+                np.zeros((n_frames, 0), dtype=bool))
+    slots = np.arange(len(frame_index)) - np.searchsorted(frame_index, frame_index, side="left")
+    width = int(slots.max()) + 1
+    padded = np.full((n_frames, width) + values.shape[1:], fill, dtype=values.dtype)
+    mask = np.zeros((n_frames, width), dtype=bool)
+    padded[frame_index, slots] = values
+    mask[frame_index, slots] = True
+    return padded, mask
+
+
+def pack_store(store: DetectionStore, start: int = 0, stop: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """Packs frames [start, stop) of a DetectionStore into the same padded arrays as pack_frames."""
+    stop = len(store) if stop is None else min(stop, len(store))
+    columns = store.columns(start, stop)
+    frame_index = columns["frame"].astype(np.int64) - start
+    n_frames = stop - start
+    packed = {}
+    for cls, name in ((BALL, "ball"), (RIM, "rim"), (PLAYER, "player")):
+        selected = columns["cls"] == cls
+        boxes, mask = pad_sorted(frame_index[selected], columns["bbox"][selected], n_frames)
+        packed[name + "s"] = boxes
+        packed[name + "_mask"] = mask
+        if cls == PLAYER:
+            packed["player_ids"], _ = pad_sorted(frame_index[selected],
+                                                 columns["user_id"][selected].astype(np.int64),
+                                                 n_frames, fill=NO_USER)
+    return packed
+
+
+def possession_batch(packed: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Vectorized determine_possession for a batch of frames.
+    Returns one user id per frame, NO_USER where nobody has the ball. Like the
+    scalar version, the first ball (in detection order) near a player wins,
+    then the first player near that ball.
+    """
+    balls, players = packed["balls"], packed["players"]
+    n_frames, n_balls, n_players = balls.shape[0], balls.shape[1], players.shape[1]
+    if n_balls == 0 or n_players == 0:
+        return np.full(n_frames, NO_USER, dtype=np.int64)
+    near = (near_matrix(balls, players)
+            & packed["ball_mask"][:, :, None]
+            & packed["player_mask"][:, None, :])
+    flat = near.reshape(n_frames, n_balls * n_players)
+    first = flat.argmax(axis=1) % n_players
+    user_ids = packed["player_ids"][np.arange(n_frames), first]
+    return np.where(flat.any(axis=1), user_ids, NO_USER)
+
+
+def shot_ball_mask(packed: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Vectorized detect_shots: an (frames, balls) mask of the packed balls near
+    any rim, i.e. the shot attempts, in detection order.
+    """
+    balls, rims = packed["balls"], packed["rims"]
+    if balls.shape[1] == 0 or rims.shape[1] == 0:
+        return np.zeros(balls.shape[:2], dtype=bool)
+    near = (near_matrix(balls, rims)
+            & packed["ball_mask"][:, :, None]
+            & packed["rim_mask"][:, None, :])
+    return near.any(axis=2)
+
+
+def shot_flags_batch(packed: Dict[str, np.ndarray]) -> np.ndarray:
+    """Vectorized bool(detect_shots(frame)) for a batch of frames."""
+    return shot_ball_mask(packed).any(axis=1)
+
+
+def frame_states_packed(packed: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Returns get_frame_state's {"possession", "shot"} state for every packed frame."""
+    possession = possession_batch(packed)
+    shots = shot_flags_batch(packed)
+    states = []
+    for user_id, shot in zip(possession.tolist(), shots.tolist()):
+        states.append({"possession": None if user_id == NO_USER else user_id, "shot": shot})
+    return states
+
+
+def frame_states_batch(frames: List[dict]) -> List[Dict[str, Any]]:
+    """
+    Vectorized get_frame_state for a batch of frame dictionaries.
+    Returns the same {"possession", "shot"} states, one per frame.
+    """
+    if not frames:
+        return []
+    return frame_states_packed(pack_frames(frames))
+
+
+def frame_states_store(store: DetectionStore, start: int = 0,
+                       stop: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Vectorized get_frame_state for frames [start, stop) of a DetectionStore."""
+    stop = len(store) if stop is None else min(stop, len(store))
+    if stop <= start:
+        return []
+    return frame_states_packed(pack_store(store, start, stop))
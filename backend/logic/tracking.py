@@ -0,0 +1,109 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, List
+
+from logic.detection_store import NO_USER
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Intersection over union of every (n, 4) xyxy box in a with every (m, 4) box in b."""
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)[:, None, :]
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)[None, :, :]
+    w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = w * h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+@dataclass
+class Track:
+    track_id: int
+    box: np.ndarray
+    user_id: int = NO_USER
+    # Identity confidence: the classifier's, decayed every frame since.
+    confidence: float = 0.0
+    # Frames since the track was last classified (starts "due").
+    since_classified: int = 1 << 30
+    misses: int = 0
+    # Classification requested but not yet assigned.
+    pending: bool = False
+
+
+class PlayerTracker:
+    """
+    Greedy IoU tracker for the detector's person boxes.
+
+    Every person box is matched to the existing track it overlaps most (IoU of
+    at least iou_threshold) or starts a new track; tracks unmatched for more
+    than max_misses frames are dropped. A track keeps the user_id it was last
+    classified as, so the classifier only has to run when a track is born, when
+    its decaying identity confidence drops below min_confidence, or every
+    reclassify_every frames. Tracks the classifier could not identify are
+    retried every retry_every frames.
+    """
+    def __init__(self, iou_threshold: float = 0.3, max_misses: int = 15, decay: float = 0.98,
+                 min_confidence: float = 0.3, reclassify_every: int = 90, retry_every: int = 10):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.decay = decay
+        self.min_confidence = min_confidence
+        self.reclassify_every = reclassify_every
+        self.retry_every = retry_every
+        self.tracks: List[Track] = []
+        self.next_id = 0
+
+    def describe(self) -> Dict[str, float]:
+        """Settings that change tracking output; part of the detection cache key."""
+        return {"iou_threshold": self.iou_threshold, "max_misses": self.max_misses, "decay": self.decay,
+                "min_confidence": self.min_confidence, "reclassify_every": self.reclassify_every,
+                "retry_every": self.retry_every}
+
+    def update(self, boxes: np.ndarray) -> List[Track]:
+        """Associates one frame's (k, 4) person boxes; returns the track of each box, in order."""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        assigned: List[Track] = [None] * len(boxes)
+        matched = set()
+        if self.tracks and len(boxes):
+            iou = iou_matrix(np.stack([t.box for t in self.tracks]), boxes)
+            # Best overlaps first; each track and each box is used once.
+            for flat in np.argsort(iou, axis=None)[::-1]:
+                t, b = divmod(int(flat), len(boxes))
+                if iou[t, b] < self.iou_threshold:
+                    break
+                if t in matched or assigned[b] is not None:
+                    continue
+                matched.add(t)
+                assigned[b] = self.tracks[t]
+        for t, track in enumerate(self.tracks):
+            track.since_classified += 1
+            if t in matched:
+                track.misses = 0
+                track.confidence *= self.decay
+            else:
+                track.misses += 1
+        for b, box in enumerate(boxes):
+            if assigned[b] is None:
+                assigned[b] = Track(track_id=self.next_id, box=box)
+                self.next_id += 1
+                self.tracks.append(assigned[b])
+            else:
+                assigned[b].box = box
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+        return assigned
+
+    def needs_identity(self, track: Track) -> bool:
+        if track.pending:
+            return False
+        if track.user_id == NO_USER:
+            return track.since_classified >= self.retry_every
+        return track.confidence < self.min_confidence or track.since_classified >= self.reclassify_every
+
+    def assign(self, track: Track, user_id: int, confidence: float):
+        """Records a classification of track (user_id NO_USER if nobody was recognised)."""
+        track.user_id = user_id
+        track.confidence = confidence if user_id != NO_USER else 0.0
+        track.since_classified = 0
+        track.pending = False
@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# In-progress resumable uploads live here until they are completed.
+PARTIAL_DIR = os.path.join(backend_dir, "partial_uploads")
+
+# Bytes read from the request and written to disk at a time.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Largest accepted upload; full games from the iOS app can be several GB.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(8 * 1024 ** 3)))
+# Seconds after its last chunk that an unfinished resumable upload is deleted.
+RESUMABLE_UPLOAD_TTL = float(os.getenv("RESUMABLE_UPLOAD_TTL", str(24 * 3600)))
+
+# Running content hashes of resumable uploads, by upload id.
+_partial_hashes: Dict[str, "hashlib._Hash"] = {}
+# One append at a time per upload: a retry overlapping a stalled request must not
+# write to the file (or the hash) while the first one still does.
+_upload_locks: Dict[str, asyncio.Lock] = {}
+
+
+def _too_large(max_bytes: int):
+    return HTTPException(status_code=413, detail=f"Upload exceeds the {max_bytes} byte limit")
+
+
+async def _write_chunks(chunks: AsyncIterator[bytes], f, digest, size: int, max_bytes: int) -> int:
+    """Writes chunks to f off the event loop, updating digest; returns the new total size."""
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        size += len(chunk)
+        if size > max_bytes:
+            raise _too_large(max_bytes)
+        digest.update(chunk)
+        await run_in_threadpool(f.write, chunk)
+    return size
+
+
+async def _file_chunks(file: UploadFile) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def save_upload(file: UploadFile, dest_path: str,
+                      max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[int, str]:
+    """
+    Streams an uploaded file to dest_path in fixed-size chunks, so the upload is
+    never held in memory. Returns (size in bytes, SHA-256 of the content).
+    The file only appears at dest_path once it is complete.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+    tmp_path = f"{dest_path}.part"
+    digest = hashlib.sha256()
+    try:
+        with open(tmp_path, "wb") as f:
+            size = await _write_chunks(_file_chunks(file), f, digest, 0, max_bytes)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return size, digest.hexdigest()
+
+
+# --- Resumable uploads ---
+# The client creates an upload, sends the file as sequential chunks with the
+# offset they start at, and can ask for the current offset to resume after a
+# dropped connection. Completing the upload moves it to its destination; an
+# upload left unfinished for RESUMABLE_UPLOAD_TTL seconds is deleted.
+
+def _partial_paths(upload_id: str) -> Tuple[str, str]:
+    if not upload_id.isalnum():
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return (os.path.join(PARTIAL_DIR, f"{upload_id}.part"),
+            os.path.join(PARTIAL_DIR, f"{upload_id}.json"))
+
+
+def expire_resumable_uploads(now: Optional[float] = None):
+    """
+    Deletes resumable uploads that received no chunk for RESUMABLE_UPLOAD_TTL
+    seconds, with their hash state and lock. An upload with a chunk being
+    written is kept.
+    """
+    now = time.time() if now is None else now
+    names = os.listdir(PARTIAL_DIR) if os.path.isdir(PARTIAL_DIR) else []
+    upload_ids = {os.path.splitext(name)[0] for name in names if name.endswith((".part", ".json"))}
+    for upload_id in upload_ids | set(_partial_hashes) | set(_upload_locks):
+        lock = _upload_locks.get(upload_id)
+        if not upload_id.isalnum() or (lock is not None and lock.locked()):
+            continue
+        paths = [path for path in _partial_paths(upload_id) if os.path.exists(path)]
+        if paths and now - max(os.path.getmtime(path) for path in paths) <= RESUMABLE_UPLOAD_TTL:
+            continue
+        for path in paths:
+            os.unlink(path)
+        _partial_hashes.pop(upload_id, None)
+        _upload_locks.pop(upload_id, None)
+        if paths:
+            print(f"Expired resumable upload {upload_id}")
+
+
+def create_resumable_upload(filename: str, size: int, metadata: Optional[dict] = None) -> dict:
+    if size > MAX_UPLOAD_BYTES:
+        raise _too_large(MAX_UPLOAD_BYTES)
+    expire_resumable_uploads()
+    os.makedirs(PARTIAL_DIR, exist_ok=True)
+    upload_id = uuid.uuid4().hex
+    data_path, meta_path = _partial_paths(upload_id)
+    open(data_path, "wb").close()
+    info = {"upload_id": upload_id, "filename": os.path.basename(filename), "size": size,
+            "metadata": metadata or {}}
+    with open(meta_path, "w") as f:
+        json.dump(info, f)
+    _partial_hashes[upload_id] = hashlib.sha256()
+    return {**info, "offset": 0, "chunk_size": UPLOAD_CHUNK_SIZE}
+
+
+def get_resumable_upload(upload_id: str) -> dict:
+    data_path, meta_path = _partial_paths(upload_id)
+    if not os.path.exists(meta_path):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    with open(meta_path) as f:
+        info = json.load(f)
+    return {**info, "offset": os.path.getsize(data_path)}
+
+
+def _resume_hash(upload_id: str, data_path: str):
+    """Hash state for an upload, rebuilt from the partial file after a restart."""
+    digest = _partial_hashes.get(upload_id)
+    if digest is None:
+        digest = hashlib.sha256()
+        with open(data_path, "rb") as f:
+            for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        _partial_hashes[upload_id] = digest
+    return digest
+
+
+async def append_resumable_chunk(upload_id: str, offset: int, chunks: AsyncIterator[bytes]) -> dict:
+    """
+    Appends a chunk stream that starts at offset; a mismatched offset is rejected with 409.
+    Appends to one upload wait for each other, and the offset is checked once the lock is held.
+    """
+    get_resumable_upload(upload_id)
+    async with _upload_locks.setdefault(upload_id, asyncio.Lock()):
+        info = get_resumable_upload(upload_id)
+        if offset != info["offset"]:
+            raise HTTPException(status_code=409, detail={"message": "Offset mismatch", "offset": info["offset"]})
+        data_path, _ = _partial_paths(upload_id)
+        digest = _resume_hash(upload_id, data_path)
+        with open(data_path, "ab") as f:
+            try:
+                size = await _write_chunks(chunks, f, digest, offset, info["size"])
+            except BaseException:
+                # Drop the half-written chunk and the hash state; both are rebuilt from disk.
+                f.truncate(offset)
+                _partial_hashes.pop(upload_id, None)
+                raise
+    return {**info, "offset": size}
+
+
+def complete_resumable_upload(upload_id: str, dest_path: str) -> Tuple[int, str]:
+    """Moves a fully received upload to dest_path; returns (size, SHA-256)."""
+    info = get_resumable_upload(upload_id)
+    lock = _upload_locks.get(upload_id)
+    if lock is not None and lock.locked():
+        raise HTTPException(status_code=409, detail={"message": "Chunk still being written", "offset": info["offset"]})
+    if info["offset"] != info["size"]:
+        raise HTTPException(status_code=409, detail={"message": "Upload incomplete", "offset": info["offset"]})
+    data_path, meta_path = _partial_paths(upload_id)
+    digest = _resume_hash(upload_id, data_path)
+    os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+    os.replace(data_path, dest_path)
+    os.unlink(meta_path)
+    _partial_hashes.pop(upload_id, None)
+    _upload_locks.pop(upload_id, None)
+    return info["size"], digest.hexdigest()
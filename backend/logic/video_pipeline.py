@@ -0,0 +1,195 @@
+import queue
+import threading
+from typing import Any, Callable, Generator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Marks the end of the stream on a stage queue.
+_END = object()
+
+
+class _EndOfVideo:
+    """End of stream marker carrying the number of frames in the video."""
+    def __init__(self, frame_count: int):
+        self.frame_count = frame_count
+
+
+class _StageError:
+    """Carries an exception raised in a worker thread to the consumer."""
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class FramePool:
+    """
+    Fixed set of preallocated frame buffers.
+    The decoder reads frames straight into these buffers and the inference stage
+    hands them back once the models are done with them, so frames are never
+    allocated one by one and memory is capped by the pool size.
+    """
+    def __init__(self, shape, count: int):
+        self._free: "queue.Queue[np.ndarray]" = queue.Queue()
+        for _ in range(count):
+            self._free.put(np.empty(shape, dtype=np.uint8))
+
+    def acquire(self, stop: threading.Event):
+        """Waits for a free buffer; returns None if the pipeline is stopping."""
+        while not stop.is_set():
+            try:
+                return self._free.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def release(self, buffers: List[np.ndarray]):
+        for buffer in buffers:
+            self._free.put(buffer)
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Blocking put that gives up when the pipeline is stopping."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    """Blocking get that gives up when the pipeline is stopping."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _END
+
+
+def _decode_stage(cap, first_frame, pool: FramePool, out_q: queue.Queue,
+                  batch_size: int, stride: Optional[Callable[[], int]], stop: threading.Event,
+                  start_frame: int = 0, end_frame: Optional[int] = None):
+    try:
+        batch = [(start_frame, first_frame)]
+        frame_count = start_frame + 1
+        next_keyframe = start_frame + (stride() if stride else 1)
+        while not stop.is_set():
+            index = frame_count
+            if end_frame is not None and index >= end_frame:
+                break
+            if index < next_keyframe:
+                # Skipped frame: advance the stream without decoding it into a buffer.
+                if not cap.grab():
+                    break
+                frame_count += 1
+                continue
+            buffer = pool.acquire(stop)
+            if buffer is None:
+                return
+            ret, frame = cap.read(buffer)
+            if not ret:
+                pool.release([buffer])
+                break
+            frame_count += 1
+            batch.append((index, frame))
+            next_keyframe = index + (stride() if stride else 1)
+            if len(batch) >= batch_size:
+                if not _put(out_q, batch, stop):
+                    return
+                batch = []
+        if batch:
+            _put(out_q, batch, stop)
+        _put(out_q, _EndOfVideo(frame_count), stop)
+    except BaseException as e:
+        _put(out_q, _StageError(e), stop)
+
+
+def _infer_stage(infer_batch: Callable[[List[np.ndarray]], Any], pool: FramePool,
+                 in_q: queue.Queue, out_q: queue.Queue, stop: threading.Event):
+    try:
+        while not stop.is_set():
+            batch = _get(in_q, stop)
+            if batch is _END or isinstance(batch, (_EndOfVideo, _StageError)):
+                _put(out_q, batch, stop)
+                return
+            indices = [index for index, _ in batch]
+            frames = [frame for _, frame in batch]
+            payload = infer_batch(frames)
+            # The models have copied what they need; the buffers can be refilled.
+            pool.release(frames)
+            if not _put(out_q, (indices, payload), stop):
+                return
+    except BaseException as e:
+        _put(out_q, _StageError(e), stop)
+
+
+def run_video_pipeline(video_path: str,
+                       infer_batch: Callable[[List[np.ndarray]], Any],
+                       postprocess_batch: Callable[[Any], List[Any]],
+                       batch_size: int = 8,
+                       queue_depth: int = 4,
+                       stride: Optional[Callable[[], int]] = None,
+                       start_frame: int = 0,
+                       end_frame: Optional[int] = None) -> Generator[Tuple[int, Any], None, int]:
+    """
+    Runs a video through a three-stage pipeline and yields (frame index, result)
+    for every frame that went through the models. Returns the video's frame count
+    (the index after the last frame read).
+
+    start_frame and end_frame restrict the run to frames [start_frame, end_frame)
+    (end_frame None reads to the end); frame indices stay those of the whole video.
+
+    A decoder thread reads batches of frames into pooled buffers, an inference
+    thread runs infer_batch on each batch, and the calling thread runs
+    postprocess_batch and yields its per-frame outputs in frame order.
+    Stages are connected by queues holding at most queue_depth batches.
+
+    When stride is given it is called after each decoded frame and returns how
+    many frames to advance to the next one sent to the models; the frames in
+    between are grabbed but not decoded. It is called from the decoder thread,
+    which runs up to (queue_depth + 2) * batch_size frames ahead of the results
+    unless stride blocks to hold it back (see StridePolicy).
+    """
+    cap = cv2.VideoCapture(video_path)
+    if start_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    ret, first_frame = cap.read()
+    if not ret or (end_frame is not None and end_frame <= start_frame):
+        cap.release()
+        return start_frame
+
+    # Enough buffers for a batch being decoded, queue_depth queued batches and
+    # a batch in inference.
+    pool = FramePool(first_frame.shape, (queue_depth + 2) * batch_size)
+    decoded_q: queue.Queue = queue.Queue(maxsize=queue_depth)
+    inferred_q: queue.Queue = queue.Queue(maxsize=queue_depth)
+    stop = threading.Event()
+
+    decoder = threading.Thread(target=_decode_stage, name="video-decode", daemon=True,
+                               args=(cap, first_frame, pool, decoded_q, batch_size, stride, stop,
+                                     start_frame, end_frame))
+    inferrer = threading.Thread(target=_infer_stage, name="video-infer", daemon=True,
+                                args=(infer_batch, pool, decoded_q, inferred_q, stop))
+    decoder.start()
+    inferrer.start()
+
+    try:
+        while True:
+            item = _get(inferred_q, stop)
+            if item is _END:
+                return start_frame
+            if isinstance(item, _EndOfVideo):
+                return item.frame_count
+            if isinstance(item, _StageError):
+                raise item.error
+            indices, payload = item
+            for index, result in zip(indices, postprocess_batch(payload)):
+                yield index, result
+    finally:
+        # Also reached when the consumer stops iterating early.
+        stop.set()
+        decoder.join()
+        inferrer.join()
+        cap.release()
@@ -0,0 +1,79 @@
+import os
+import bisect
+import subprocess
+from typing import List, Optional, Tuple
+
+import cv2
+
+# Worker processes a single video's analysis is split over; 1 analyses it serially.
+SHARD_WORKERS = int(os.getenv("VIDEO_SHARD_WORKERS", "1"))
+# Shortest shard worth a process of its own (one minute at 30 fps).
+MIN_SHARD_FRAMES = 1800
+# Frames analysed before each shard (and discarded) so the tracker and the
+# adaptive stride are settled by the time the shard starts.
+SHARD_WARMUP_FRAMES = 60
+
+
+def probe_keyframes(video_path: str) -> Optional[Tuple[int, List[int]]]:
+    """
+    Frame count and keyframe indices of the first video stream, read from the
+    packet flags with ffprobe. Returns None if ffprobe is unavailable or fails.
+    """
+    try:
+        output = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "v:0",
+             "-show_entries", "packet=flags", "-of", "csv=p=0", video_path],
+            capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    flags = [line.strip() for line in output.splitlines() if line.strip()]
+    keyframes = [i for i, flag in enumerate(flags) if "K" in flag]
+    return (len(flags), keyframes) if flags else None
+
+
+def video_frame_count(video_path: str) -> int:
+    cap = cv2.VideoCapture(video_path)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return frame_count
+
+
+def plan_shards(frame_count: int, shards: int, keyframes: Optional[List[int]] = None,
+                align: int = 1, min_frames: int = MIN_SHARD_FRAMES) -> List[Tuple[int, Optional[int]]]:
+    """
+    Splits frames [0, frame_count) into at most shards (start, stop) ranges of
+    about equal length, each at least min_frames long. Boundaries snap to the
+    nearest keyframe when keyframes are known (uniform split otherwise) and are
+    then rounded down to a multiple of align. The last range has stop None, so
+    it runs to the end even if frame_count is an estimate.
+    """
+    count = max(1, min(shards, frame_count // max(min_frames, 1)))
+    boundaries: List[int] = []
+    for k in range(1, count):
+        target = round(k * frame_count / count)
+        if keyframes:
+            i = bisect.bisect_left(keyframes, target)
+            nearby = keyframes[max(i - 1, 0):i + 1]
+            target = min(nearby, key=lambda keyframe: abs(keyframe - target))
+        target -= target % max(align, 1)
+        if target > (boundaries[-1] if boundaries else 0) and target < frame_count:
+            boundaries.append(target)
+    starts = [0] + boundaries
+    stops: List[Optional[int]] = boundaries + [None]
+    return list(zip(starts, stops))
+
+
+def decode_start(start: int, warmup: int, keyframes: Optional[List[int]] = None, align: int = 1) -> int:
+    """
+    Frame a shard starting at start begins decoding from: at least warmup
+    frames earlier, moved back to a keyframe (so the seek is exact and cheap)
+    and to a multiple of align (so strided keyframes match a serial run).
+    """
+    if start == 0:
+        return 0
+    first = max(start - warmup, 0)
+    if keyframes:
+        i = bisect.bisect_right(keyframes, first)
+        if i:
+            first = keyframes[i - 1]
+    return first - first % max(align, 1)
@@ -1,12 +1,81 @@
-from moviepy.editor import VideoFileClip, AudioFileClip
+"""
+Attaches commentary to a video with a local ffmpeg binary. The per-event
+commentary clips are delayed to their event times and mixed into one track
+as ffmpeg streams them; the video stream is copied as is, so only the audio
+is encoded.
+"""
+import os
+import subprocess
+import tempfile
+from typing import Any, Dict, List
+
+FFMPEG = os.getenv("FFMPEG_BINARY", "ffmpeg")
+FFPROBE = os.getenv("FFPROBE_BINARY", "ffprobe")
+# Level of the video's own audio under the commentary.
+ORIGINAL_AUDIO_VOLUME = 0.5
+AUDIO_CODEC = ["-c:a", "aac", "-b:a", "192k"]
+
+
+def has_audio(video_path: str) -> bool:
+    """Whether the video has an audio stream (False if ffprobe is unavailable)."""
+    try:
+        output = subprocess.run(
+            [FFPROBE, "-v", "error", "-select_streams", "a", "-show_entries", "stream=index",
+             "-of", "csv=p=0", video_path],
+            capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return False
+    return bool(output.strip())
+
+
+def commentary_filter(segments: List[Dict[str, Any]], original_audio: bool) -> str:
+    """
+    Filter graph mixing the base track (the video's audio in input 0, or the
+    silence in input 1) with the clips in the inputs after it, each delayed to
+    its segment time; the mix is [aout].
+    """
+    base = f"[0:a]volume={ORIGINAL_AUDIO_VOLUME}[base]" if original_audio else "[1:a]anull[base]"
+    first_clip = 1 if original_audio else 2
+    chains = [base]
+    for i, segment in enumerate(segments):
+        delay = max(0, round(segment["time"] * 1000))
+        chains.append(f"[{first_clip + i}:a]adelay=delays={delay}:all=1[c{i}]")
+    labels = "".join(f"[c{i}]" for i in range(len(segments)))
+    # duration=first: the mix lasts as long as the base track.
+    chains.append(f"[base]{labels}amix=inputs={len(segments) + 1}:duration=first:normalize=0[aout]")
+    return ";\n".join(chains)
+
+
+def mux_commentary(video_path: str, segments: List[Dict[str, Any]], output_path: str,
+                   keep_original_audio: bool = True):
+    """
+    Writes output_path: the video stream of video_path, copied without
+    re-encoding, with the commentary segments ({"time", "audio_file"}) mixed
+    over the video's own audio (if any and keep_original_audio).
+    """
+    original_audio = keep_original_audio and has_audio(video_path)
+    # Without the video's audio, mix over endless silence; -shortest ends the output with the video.
+    base_input = [] if original_audio else ["-f", "lavfi", "-i", "anullsrc=r=44100:cl=stereo"]
+    clip_inputs = [arg for segment in segments for arg in ("-i", segment["audio_file"])]
+
+    # The graph, one chain per clip, goes in a script file rather than the argument list; the clips
+    # themselves are still one -i each, which stays far below the argument limit for a game's events.
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as script:
+        script.write(commentary_filter(segments, original_audio))
+    try:
+        command = [FFMPEG, "-y", "-v", "error", "-i", video_path, *base_input, *clip_inputs,
+                   "-filter_complex_script", script.name,
+                   "-map", "0:v:0", "-map", "[aout]", "-c:v", "copy", *AUDIO_CODEC,
+                   "-shortest", output_path]
+        result = subprocess.run(command, capture_output=True, text=True)
+    finally:
+        os.unlink(script.name)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed ({result.returncode}): {result.stderr.strip()[-500:]}")
+    print(f"Commentary video saved as {output_path}")
+
 
 def overlay_audio_on_video(video_path, audio_path, output_path):
-    video_clip = VideoFileClip(video_path)
-    
-    audio_clip = AudioFileClip(audio_path)
-    
-    audio_clip = audio_clip.set_duration(video_clip.duration)
-    
-    final_clip = video_clip.set_audio(audio_clip)
-    
-    final_clip.write_videofile(output_path, codec="libx264", audio_codec="aac")
\ No newline at end of file
+    """Replaces the video's audio with audio_path, copying the video stream."""
+    mux_commentary(video_path, [{"time": 0.0, "audio_file": audio_path}], output_path,
+                   keep_original_audio=False)
@@ -0,0 +1,9 @@
+from fastapi import APIRouter
+from logic.commentary_cache import cache_stats
+
+commentary_routes = APIRouter()
+
+@commentary_routes.get("/commentary/cache/")
+async def commentary_cache_stats():
+    """Commentary text / audio cache hits and misses of every process, and its size on disk."""
+    return cache_stats()
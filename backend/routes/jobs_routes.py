@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException
+from logic.jobs import job_manager
+
+jobs_routes = APIRouter()
+
+@jobs_routes.get("/jobs/")
+async def list_jobs():
+    return {"jobs": [job.to_dict() for job in job_manager.list_jobs()]}
+
+@jobs_routes.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Status and progress (0.0 to 1.0) of a background job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@jobs_routes.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return job_manager.result(job_id)
+
+@jobs_routes.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not job_manager.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job is already {job.status}")
+    return job_manager.get(job_id).to_dict()
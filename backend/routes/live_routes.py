@@ -0,0 +1,80 @@
+import asyncio
+from typing import List
+from fastapi import APIRouter, HTTPException, UploadFile, WebSocket, WebSocketDisconnect
+from logic.live_analysis import live_sessions, start_session, stop_session
+
+live_routes = APIRouter()
+
+def get_session(session_id: str):
+    # Sessions leave live_sessions once closed, failed or idle past LIVE_IDLE_TIMEOUT.
+    session = live_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Live session not found")
+    return session
+
+@live_routes.websocket("/live/ws")
+async def live_socket(websocket: WebSocket, window_size: int = 10, frame_rate: float = 30.0):
+    """
+    Live analysis over one WebSocket: the app sends each frame as a binary
+    message (JPEG), and receives JSON messages for every detected event.
+    The first message sent back is {"type": "session", ...}.
+    """
+    await websocket.accept()
+    session = start_session(window_size, frame_rate)
+    events = session.subscribe()
+
+    async def send_events():
+        while True:
+            await websocket.send_json(await events.get())
+
+    sender = asyncio.create_task(send_events())
+    try:
+        await websocket.send_json({"type": "session", **session.to_dict()})
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if not session.alive:
+                # The worker failed; its error message has been sent.
+                break
+            if message.get("bytes"):
+                session.push_frame(message["bytes"])
+            elif message.get("text") == "stats":
+                await websocket.send_json({"type": "stats", **session.to_dict()})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        session.unsubscribe(events)
+        await asyncio.to_thread(stop_session, session.session_id)
+
+# Chunked-POST alternative for clients without WebSockets: frames go in with
+# POST /live/sessions/{id}/frames (or /upload_clips/?session_id=...) and events
+# are polled with GET /live/sessions/{id}/events?after=<last seq>.
+
+@live_routes.post("/live/sessions/")
+async def create_live_session(window_size: int = 10, frame_rate: float = 30.0):
+    return start_session(window_size, frame_rate).to_dict()
+
+@live_routes.get("/live/sessions/{session_id}")
+async def live_session_status(session_id: str):
+    """Frames received / analysed / dropped and per-stage latencies."""
+    return get_session(session_id).to_dict()
+
+@live_routes.post("/live/sessions/{session_id}/frames")
+async def push_live_frames(session_id: str, frames: List[UploadFile]):
+    session = get_session(session_id)
+    for file in frames:
+        session.push_frame(await file.read())
+    return {"received": len(frames)}
+
+@live_routes.get("/live/sessions/{session_id}/events")
+async def live_events(session_id: str, after: int = 0):
+    return {"events": get_session(session_id).events_after(after)}
+
+@live_routes.delete("/live/sessions/{session_id}")
+async def close_live_session(session_id: str):
+    session = await asyncio.to_thread(stop_session, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Live session not found")
+    return session.to_dict()
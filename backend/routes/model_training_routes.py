@@ -1,18 +1,29 @@
 import os
-from fastapi import APIRouter, UploadFile, File
-from logic.model_training_logic import UPLOAD_DIR, DATASET_DIR, process_videos, train_model_logic, test_model_logic, reset_dataset_dir
+from fastapi import APIRouter, HTTPException, UploadFile, File
+from logic.model_training_logic import UPLOAD_DIR, DATASET_DIR, train_model_job, test_model_logic, reset_dataset_dir, ensure_dataset_dirs
+from logic.jobs import job_manager
+from logic.uploads import save_upload
+from logic.live_analysis import live_sessions
 import shutil
-from typing import List
+from typing import List, Optional
 
 model_routes = APIRouter()
 
 @model_routes.post("/upload_clips/")
-async def upload_clips(frames: List[UploadFile]):
+async def upload_clips(frames: List[UploadFile], session_id: Optional[str] = None):
+    if session_id is not None:
+        # Live mode: frames go straight to the session's analysis, not to disk.
+        session = live_sessions.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Live session not found")
+        for file in frames:
+            session.push_frame(await file.read())
+        return {"uploaded_files": [file.filename for file in frames], "session_id": session_id,
+                "message": "Frames queued for live analysis"}
     uploaded_files = []
     for file in frames:
         file_path = f"./live_frames/{file.filename}"
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
+        await save_upload(file, file_path)
         uploaded_files.append(file.filename)
     
     return {"uploaded_files": uploaded_files, "message": "Files uploaded successfully"}
@@ -21,36 +32,43 @@ async def upload_clips(frames: List[UploadFile]):
 @model_routes.post("/upload_game/")
 async def upload_game(file: UploadFile = File(...)):
     file_path = f"./games/{file.filename}"  # Define the save path
-    with open(file_path, "wb") as f:
-        f.write(await file.read())  # Asynchronously write the file
-    return {"filename": file.filename, "message": "File uploaded successfully"}
+    size, sha256 = await save_upload(file, file_path)  # Stream the file to disk in chunks
+    return {"filename": file.filename, "size": size, "sha256": sha256, "message": "File uploaded successfully"}
 
 @model_routes.post("/upload_video/")
-async def upload_video(file: UploadFile = File(...), player_name: str = "", player_team: str = ""):
+async def upload_video(file: UploadFile = File(...), player_name: str = "", player_team: str = "",
+                       incremental: bool = False):
     # Extract the file extension
     ext = os.path.splitext(file.filename)[1]
     # Create a new file name based on player_name and player_team
     new_filename = f"{player_name}_{player_team}{ext}"
     video_path = os.path.join(UPLOAD_DIR, new_filename)
     
-    with open(video_path, "wb") as f:
-        f.write(await file.read())
-    reset_dataset_dir()
+    await save_upload(file, video_path)
+    if incremental:
+        # Keep the other players' extracted frames; only this player is added.
+        ensure_dataset_dirs()
+    else:
+        reset_dataset_dir()
     
     return {"filename": new_filename}
 
 
 @model_routes.post("/train_model/")
-async def train_model():
-    process_videos(UPLOAD_DIR)
-    train_model_logic()
-    return {"message": "Model trained and exported to CoreML."}
+async def train_model(incremental: bool = False):
+    """
+    Queues dataset extraction and training; poll /jobs/{job_id} for progress.
+    With incremental=true only players uploaded since the last training (new
+    ones, or existing ones whose frames are replaced) are extracted and the
+    current classifier is fine-tuned on them; with none, nothing is trained.
+    """
+    job = job_manager.submit("train_model", train_model_job, incremental=incremental)
+    return job.to_dict()
 
 @model_routes.post("/test_model/")
 async def test_model(file: UploadFile = File(...)):
     image_path = os.path.join(UPLOAD_DIR, file.filename)
-    with open(image_path, "wb") as f:
-        f.write(await file.read())
+    await save_upload(file, image_path)
     
     detections = test_model_logic(image_path)
     return {"detections": detections}
@@ -1,26 +1,20 @@
 from fastapi import APIRouter, UploadFile, File
-from logic.predictions_logic import process_video, determine_possession, detect_passes, detect_shots, detect_shot_results
+from logic.jobs import job_manager
+from logic.predictions_logic import predict_video_job
+from logic.uploads import save_upload
 
 predictions_routes = APIRouter()
 
 @predictions_routes.post("/predict_video/")
 async def predict_video(file: UploadFile = File(...)):
-    """Receives a video, runs YOLO prediction, and returns detections for ball, rim, and user ID, including actions."""
+    """
+    Receives a video and queues YOLO prediction for it. Poll /jobs/{job_id} for progress;
+    /jobs/{job_id}/result returns detections for ball, rim, and user ID, including actions.
+    """
     video_path = f"uploads/{file.filename}"
     print(video_path)
-    with open(video_path, "wb") as f:
-        f.write(await file.read())
+    # The content hash computed while streaming to disk keys the detection cache.
+    _, sha256 = await save_upload(file, video_path)
     
-    frame_detections = process_video(video_path)
-    possession = determine_possession(frame_detections)
-    passes = detect_passes(frame_detections)
-    shots = detect_shots(frame_detections)
-    shot_results = detect_shot_results(frame_detections)
-    
-    return {
-        "detections": frame_detections,
-        "possession": possession,
-        "passes": passes,
-        "shots": shots,
-        "shot_results": shot_results
-    }
+    job = job_manager.submit("predict_video", predict_video_job, video_path, video_hash=sha256)
+    return job.to_dict()
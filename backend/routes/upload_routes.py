@@ -0,0 +1,59 @@
+import os
+from fastapi import APIRouter, HTTPException, Request
+from logic.uploads import (create_resumable_upload, get_resumable_upload,
+                           append_resumable_chunk, complete_resumable_upload)
+from logic.model_training_logic import UPLOAD_DIR, reset_dataset_dir, ensure_dataset_dirs
+from logic.jobs import job_manager
+from logic.predictions_logic import predict_video_job
+
+upload_routes = APIRouter()
+
+# What a completed resumable upload is used for, matching the one-shot upload routes.
+UPLOAD_KINDS = ("game", "player_video", "predict_video")
+
+@upload_routes.post("/uploads/")
+async def create_upload(filename: str, size: int, kind: str = "game",
+                        player_name: str = "", player_team: str = "", incremental: bool = False):
+    """Starts a resumable upload. Send chunks with PUT /uploads/{upload_id}?offset=N."""
+    if kind not in UPLOAD_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {UPLOAD_KINDS}")
+    return create_resumable_upload(filename, size, {"kind": kind, "player_name": player_name,
+                                                    "player_team": player_team, "incremental": incremental})
+
+@upload_routes.get("/uploads/{upload_id}")
+async def upload_status(upload_id: str):
+    """Returns the number of bytes received so far, i.e. the offset to resume from."""
+    return get_resumable_upload(upload_id)
+
+@upload_routes.put("/uploads/{upload_id}")
+async def upload_chunk(upload_id: str, offset: int, request: Request):
+    """Appends the raw request body at offset, streaming it to disk."""
+    return await append_resumable_chunk(upload_id, offset, request.stream())
+
+@upload_routes.post("/uploads/{upload_id}/complete")
+async def complete_upload(upload_id: str):
+    info = get_resumable_upload(upload_id)
+    metadata = info["metadata"]
+    kind = metadata["kind"]
+    if kind == "player_video":
+        ext = os.path.splitext(info["filename"])[1]
+        filename = f"{metadata['player_name']}_{metadata['player_team']}{ext}"
+        dest_path = os.path.join(UPLOAD_DIR, filename)
+    elif kind == "predict_video":
+        filename = info["filename"]
+        dest_path = f"uploads/{filename}"
+    else:
+        filename = info["filename"]
+        dest_path = f"./games/{filename}"
+    
+    size, sha256 = complete_resumable_upload(upload_id, dest_path)
+    response = {"filename": filename, "size": size, "sha256": sha256}
+    if kind == "player_video":
+        if metadata.get("incremental"):
+            ensure_dataset_dirs()
+        else:
+            reset_dataset_dir()
+    elif kind == "predict_video":
+        job = job_manager.submit("predict_video", predict_video_job, dest_path, video_hash=sha256)
+        response["job"] = job.to_dict()
+    return response
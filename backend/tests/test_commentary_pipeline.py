@@ -0,0 +1,98 @@
+"""
+The async commentary pipeline, run offline against the stand-in Gemini /
+ElevenLabs app (logic/commentary_standin.py) with a rate-limiting stand-in.
+"""
+import asyncio
+import random
+
+import httpx
+import pytest
+
+from logic import commentary_cache, commentary_pipeline, commentary_standin
+
+EVENT_TYPES = ["pass", "shot", "dribble", "steal"]
+
+
+class InFlight:
+    """ASGI wrapper counting the requests being served at once."""
+    def __init__(self, app):
+        self.app = app
+        self.active = 0
+        self.peak = 0
+
+    async def __call__(self, scope, receive, send):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.active -= 1
+
+
+def game_events(count):
+    """Events with distinct prompts, out of time order."""
+    events = [{"time": float(i) * 1.5, "event_type": EVENT_TYPES[i % 4],
+               "details": {"from": i, "to": i + 1, "possession": i, "result": "made", "player": i,
+                           "gained_by": i, "lost_by": i + 1}}
+              for i in range(count)]
+    random.Random(0).shuffle(events)
+    return events
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(commentary_cache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(commentary_cache, "TEXT_DIR", str(tmp_path / "text"))
+    monkeypatch.setattr(commentary_cache, "AUDIO_DIR", str(tmp_path / "audio"))
+    monkeypatch.setattr(commentary_cache, "STATS_PATH", str(tmp_path / "stats.json"))
+    return tmp_path
+
+
+@pytest.fixture
+def standin(monkeypatch):
+    monkeypatch.setattr(commentary_standin, "STANDIN_LATENCY", 0.01)
+    monkeypatch.setattr(commentary_standin, "STANDIN_RATE_LIMIT", 0.3)
+    monkeypatch.setattr(commentary_standin, "stats", {"requests": 0, "rate_limited": 0})
+    # The stand-in asks for Retry-After: 1; keep the test fast and make giving up unlikely.
+    monkeypatch.setattr(commentary_pipeline, "MAX_RETRY_DELAY", 0.01)
+    monkeypatch.setattr(commentary_pipeline, "MAX_ATTEMPTS", 12)
+    random.seed(1)
+    return commentary_standin
+
+
+def run(events, gemini, elevenlabs, concurrency):
+    return asyncio.run(commentary_pipeline.generate_commentary_segments(
+        events, concurrency=concurrency,
+        gemini_transport=httpx.ASGITransport(app=gemini),
+        elevenlabs_transport=httpx.ASGITransport(app=elevenlabs)))
+
+
+def test_segments_are_generated_in_time_order_with_retries(cache_dir, standin):
+    events = game_events(24)
+    gemini, elevenlabs = InFlight(standin.app), InFlight(standin.app)
+
+    segments = run(events, gemini, elevenlabs, concurrency=3)
+
+    assert [segment["time"] for segment in segments] == sorted(event["time"] for event in events)
+    assert standin.stats["rate_limited"] > 0
+    # Every event made it despite the 429s: one successful request per text and per clip.
+    assert standin.stats["requests"] - standin.stats["rate_limited"] == 2 * len(events)
+    assert 1 < gemini.peak <= 3
+    assert 1 < elevenlabs.peak <= 3
+    for segment in segments:
+        assert segment["commentary"].startswith("What a moment!")
+        assert segment["audio_file"].startswith(str(cache_dir))
+        assert segment["duration"] > 0
+
+
+def test_second_run_is_served_from_the_cache(cache_dir, standin):
+    events = game_events(8)
+    first = run(events, standin.app, standin.app, concurrency=4)
+    requests = standin.stats["requests"]
+
+    second = run(events, standin.app, standin.app, concurrency=4)
+
+    assert standin.stats["requests"] == requests
+    assert second == first
+    stats = commentary_cache.cache_stats()
+    assert stats["text_hits"] == len(events) and stats["audio_hits"] == len(events)
@@ -0,0 +1,26 @@
+"""Every setting that changes detection output must change the detection cache params."""
+import pytest
+
+from logic import predictions_logic, tracking
+
+
+@pytest.mark.parametrize("name,value", [("ROI_WIDTH", 160), ("ROI_HEIGHT", 320), ("ROI_MARGIN", 0.2),
+                                        ("ADAPTIVE_LOOKAHEAD", 3), ("DEFAULT_BATCH_SIZE", 16),
+                                        ("DETECTOR_CONF", 0.4), ("CLASSIFIER_MODE", "track")])
+def test_module_settings_change_params(monkeypatch, name, value):
+    before = predictions_logic.detection_params(stride=2, adaptive=True)
+    monkeypatch.setattr(predictions_logic, name, value)
+    assert predictions_logic.detection_params(stride=2, adaptive=True) != before
+
+
+@pytest.mark.parametrize("name,value", [("iou_threshold", 0.5), ("max_misses", 5), ("decay", 0.9),
+                                        ("min_confidence", 0.5), ("reclassify_every", 30), ("retry_every", 5)])
+def test_tracker_thresholds_change_params(monkeypatch, name, value):
+    before = predictions_logic.detection_params()
+    init = tracking.PlayerTracker.__init__
+
+    def patched(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        setattr(self, name, value)
+    monkeypatch.setattr(tracking.PlayerTracker, "__init__", patched)
+    assert predictions_logic.detection_params() != before
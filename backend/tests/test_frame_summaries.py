@@ -0,0 +1,41 @@
+"""
+/predict_video/'s per-frame possession, shots and shot results, computed from
+the DetectionStore columns, must match the scalar per-frame functions.
+"""
+import random
+from dataclasses import asdict
+
+from logic.detection_store import DetectionStore
+from logic.predictions_logic import (detect_shot_results, detect_shots, determine_possession,
+                                     store_frame_summaries, to_frame_detections)
+
+
+def crowded_frames(seed, count):
+    """Few, small boxes on a small court, so balls are often near players and rims."""
+    rng = random.Random(seed)
+
+    def box(size):
+        x, y = rng.uniform(0, 200), rng.uniform(0, 150)
+        return [x, y, x + size, y + size]
+    return [{"ball": [{"bounding_box": box(10), "confidence": 0.9} for _ in range(rng.randint(0, 3))],
+             "rim": [{"bounding_box": box(30), "confidence": 0.9} for _ in range(rng.randint(0, 2))],
+             "user_id": [{"user_id": rng.randint(0, 4), "bounding_box": box(60), "confidence": 0.8}
+                         for _ in range(rng.randint(0, 5))]}
+            for _ in range(count)]
+
+
+def test_store_summaries_match_the_scalar_functions():
+    frames = crowded_frames(0, 3000)
+    store = DetectionStore.from_frames(frames)
+
+    possession, shots, shot_results = store_frame_summaries(store, chunk_size=256)
+
+    expected = [to_frame_detections(frame) for frame in store.to_frames()]
+    assert possession == [determine_possession(frame) for frame in expected]
+    assert shots == [[asdict(shot) for shot in detect_shots(frame)] for frame in expected]
+    assert shot_results == [detect_shot_results(frame) for frame in expected]
+    assert any(shots) and any(p is not None for p in possession)
+
+
+def test_empty_store():
+    assert store_frame_summaries(DetectionStore()) == ([], [], [])
@@ -0,0 +1,77 @@
+"""
+Live sessions share the registry's model objects, which are not thread-safe:
+two sessions analysing at once must never call the same model concurrently.
+"""
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from logic import live_analysis
+
+
+class StubBoxes:
+    def __init__(self, boxes):
+        # (cls, xyxy, conf) per box, as the single-box views ultralytics iterates over.
+        self.cls = np.array([cls for cls, _, _ in boxes], dtype=np.float32)
+        self.xyxy = np.array([xyxy for _, xyxy, _ in boxes], dtype=np.float32).reshape(-1, 4)
+        self.conf = np.array([conf for _, _, conf in boxes], dtype=np.float32)
+
+    def __iter__(self):
+        return iter(StubBoxes([(cls, xyxy, conf)]) for cls, xyxy, conf in
+                    zip(self.cls.tolist(), self.xyxy.tolist(), self.conf.tolist()))
+
+
+class StubResult:
+    def __init__(self, boxes):
+        self.boxes = StubBoxes(boxes)
+
+
+class StubModel:
+    """Returns fixed boxes for every frame and records calls that overlap in time."""
+    def __init__(self, boxes):
+        self.boxes = boxes
+        self.active = 0
+        self.overlaps = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, frames, **kwargs):
+        with self._lock:
+            self.active += 1
+            self.calls += 1
+            self.overlaps += self.active > 1
+        time.sleep(0.005)
+        with self._lock:
+            self.active -= 1
+        return [StubResult(self.boxes) for _ in frames]
+
+
+@pytest.fixture
+def stub_models(monkeypatch):
+    detector = StubModel([(1, [10, 10, 50, 90], 0.9), (0, [60, 60, 70, 70], 0.8)])
+    classifier = StubModel([(2, [10, 10, 50, 90], 0.7)])
+    monkeypatch.setattr(live_analysis, "detection_models", lambda: (detector, classifier))
+    return detector, classifier
+
+
+def test_concurrent_sessions_do_not_share_a_model_call(stub_models):
+    detector, classifier = stub_models
+    frame = cv2.imencode(".jpg", np.zeros((96, 128, 3), dtype=np.uint8))[1].tobytes()
+    sessions = [live_analysis.start_session(), live_analysis.start_session()]
+    try:
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and min(session.analysed for session in sessions) < 40:
+            for session in sessions:
+                session.push_frame(frame)
+            time.sleep(0.001)
+        assert all(session.error is None for session in sessions)
+        assert min(session.analysed for session in sessions) >= 40
+    finally:
+        for session in sessions:
+            live_analysis.stop_session(session.session_id)
+    assert detector.calls and classifier.calls
+    assert detector.overlaps == 0
+    assert classifier.overlaps == 0
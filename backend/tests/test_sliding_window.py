@@ -0,0 +1,94 @@
+"""
+The incremental sliding window (WindowAggregator / SlidingWindowEventDetector)
+must produce exactly the events of the original list-based algorithm, which
+rebuilt the window state from a list of frame states on every frame.
+"""
+import random
+
+import pytest
+
+from logic.predictions_logic import (SlidingWindowEventDetector, WindowAggregator, aggregate_window_state,
+                                     determine_event_change, get_frame_state,
+                                     process_frames_with_sliding_window)
+
+PLAYERS = {user_id: [200.0 * user_id, 300.0, 200.0 * user_id + 50, 400.0] for user_id in range(4)}
+RIM = [800.0, 50.0, 850.0, 80.0]
+
+
+def list_window_events(frames, window_size, frame_rate=30.0):
+    """The original O(window) implementation, kept here as the reference."""
+    events = []
+    if len(frames) < window_size:
+        return events
+    window_states = [get_frame_state(frame) for frame in frames[:window_size]]
+    prev_agg_state = aggregate_window_state(window_states)
+    for i in range(window_size, len(frames)):
+        window_states.pop(0)
+        window_states.append(get_frame_state(frames[i]))
+        curr_agg_state = aggregate_window_state(window_states)
+        if curr_agg_state != prev_agg_state:
+            event = determine_event_change(prev_agg_state, curr_agg_state, frame_index=i, frame_rate=frame_rate)
+            if event is not None:
+                events.append(event)
+        prev_agg_state = curr_agg_state
+    return events
+
+
+def recorded_stream(seed, length=600):
+    """
+    A seeded detection stream shaped like a real one: four players and a rim,
+    and a ball that is held, passed, lost, shot or missing for runs of frames,
+    with the odd detection dropout.
+    """
+    rng = random.Random(seed)
+    frames = []
+    while len(frames) < length:
+        phase = rng.choice(["held", "held", "held", "loose", "shot", "none"])
+        holder = rng.choice(list(PLAYERS))
+        for _ in range(rng.randint(3, 40)):
+            players = [{"user_id": user_id, "bounding_box": list(box), "confidence": 0.9}
+                       for user_id, box in PLAYERS.items() if rng.random() > 0.05]
+            if phase == "held":
+                x, y = PLAYERS[holder][0] + 20, PLAYERS[holder][1] + 40
+            elif phase == "shot":
+                x, y = RIM[0] + 10, RIM[1] + 5
+            else:
+                x, y = 1500.0, 900.0
+            balls = [] if phase == "none" or rng.random() < 0.05 else \
+                [{"bounding_box": [x, y, x + 15, y + 15], "confidence": 0.8}]
+            frames.append({"ball": balls, "rim": [{"bounding_box": list(RIM), "confidence": 0.9}],
+                           "user_id": players})
+    return frames[:length]
+
+
+@pytest.mark.parametrize("window_size", [1, 3, 10, 31])
+def test_window_aggregator_matches_list_window(window_size):
+    rng = random.Random(window_size)
+    aggregator = WindowAggregator(window_size)
+    window_states = []
+    for _ in range(500):
+        state = {"possession": rng.choice([None, 0, 1, 2]), "shot": rng.random() < 0.1}
+        aggregator.push(state)
+        window_states = (window_states + [state])[-window_size:]
+        assert aggregator.is_full() == (len(window_states) == window_size)
+        assert aggregator.state() == aggregate_window_state(window_states)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("window_size", [1, 5, 10])
+def test_incremental_events_match_list_window(seed, window_size):
+    frames = recorded_stream(seed)
+    expected = list_window_events(frames, window_size)
+    assert expected, "the stream should produce events"
+
+    detector = SlidingWindowEventDetector(window_size)
+    streamed = [event for event in map(detector.push, frames) if event is not None]
+    assert streamed == expected
+    assert process_frames_with_sliding_window(frames, window_size) == expected
+
+
+def test_stream_shorter_than_window_has_no_events():
+    frames = recorded_stream(0, length=5)
+    detector = SlidingWindowEventDetector(10)
+    assert all(detector.push(frame) is None for frame in frames)
+    assert process_frames_with_sliding_window(frames, 10) == []
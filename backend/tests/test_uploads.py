@@ -0,0 +1,61 @@
+"""Unfinished resumable uploads expire, files and in-memory state alike."""
+import asyncio
+import os
+import time
+
+import pytest
+
+from logic import uploads
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+@pytest.fixture
+def partial_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "PARTIAL_DIR", str(tmp_path))
+    monkeypatch.setattr(uploads, "_partial_hashes", {})
+    monkeypatch.setattr(uploads, "_upload_locks", {})
+    return tmp_path
+
+
+def age(upload_id, seconds):
+    for path in uploads._partial_paths(upload_id):
+        then = time.time() - seconds
+        os.utime(path, (then, then))
+
+
+def test_stale_uploads_expire_with_their_state(partial_dir):
+    stale = uploads.create_resumable_upload("old.mp4", 8)["upload_id"]
+    asyncio.run(uploads.append_resumable_chunk(stale, 0, chunks(b"abcd")))
+    fresh = uploads.create_resumable_upload("new.mp4", 8)["upload_id"]
+    age(stale, uploads.RESUMABLE_UPLOAD_TTL + 60)
+
+    uploads.expire_resumable_uploads()
+
+    assert sorted(os.listdir(partial_dir)) == sorted([f"{fresh}.part", f"{fresh}.json"])
+    assert stale not in uploads._partial_hashes and stale not in uploads._upload_locks
+    assert fresh in uploads._partial_hashes
+    assert uploads.get_resumable_upload(fresh)["offset"] == 0
+
+
+def test_upload_with_a_chunk_in_flight_is_kept(partial_dir):
+    upload_id = uploads.create_resumable_upload("game.mp4", 8)["upload_id"]
+    age(upload_id, uploads.RESUMABLE_UPLOAD_TTL + 60)
+
+    async def expire_while_writing():
+        lock = uploads._upload_locks.setdefault(upload_id, asyncio.Lock())
+        async with lock:
+            uploads.expire_resumable_uploads()
+
+    asyncio.run(expire_while_writing())
+    assert uploads.get_resumable_upload(upload_id)["offset"] == 0
+
+
+def test_creating_an_upload_sweeps_stale_ones(partial_dir):
+    stale = uploads.create_resumable_upload("old.mp4", 8)["upload_id"]
+    age(stale, uploads.RESUMABLE_UPLOAD_TTL + 60)
+    uploads.create_resumable_upload("new.mp4", 8)
+    assert not any(name.startswith(stale) for name in os.listdir(partial_dir))
@@ -0,0 +1,103 @@
+"""
+Sharded analysis cuts a video into keyframe-aligned ranges, detects each with
+some warm-up frames before it and merges the stores; the merge must give
+exactly the store of a serial run.
+"""
+import random
+
+import numpy as np
+import pytest
+
+from logic import predictions_logic
+from logic.detection_store import DetectionStore
+from logic.video_shards import decode_start, plan_shards
+
+
+def random_frames(seed, count):
+    rng = random.Random(seed)
+    frames = []
+    for _ in range(count):
+        box = lambda: [rng.uniform(0, 500), rng.uniform(0, 300), rng.uniform(500, 900), rng.uniform(300, 600)]
+        frames.append({
+            "ball": [{"bounding_box": box(), "confidence": rng.random()} for _ in range(rng.randint(0, 2))],
+            "rim": [{"bounding_box": box(), "confidence": rng.random()} for _ in range(rng.randint(0, 1))],
+            "user_id": [{"user_id": rng.randint(0, 5), "bounding_box": box(), "confidence": rng.random()}
+                        for _ in range(rng.randint(0, 4))],
+        })
+    return frames
+
+
+def assert_same_store(store, expected):
+    assert len(store) == len(expected)
+    assert store.size == expected.size
+    for name in ("frame", "cls", "bbox", "confidence", "user_id"):
+        np.testing.assert_array_equal(getattr(store, name)[:store.size], getattr(expected, name)[:expected.size])
+    np.testing.assert_array_equal(store.offsets[:len(store) + 1], expected.offsets[:len(expected) + 1])
+    assert store.to_frames() == expected.to_frames()
+
+
+@pytest.mark.parametrize("frame_count,shards,align", [(10000, 4, 1), (9000, 3, 5), (7321, 8, 2), (2000, 4, 1)])
+def test_plan_shards_covers_the_video_on_keyframes(frame_count, shards, align):
+    keyframes = list(range(0, frame_count, 250))
+    plan = plan_shards(frame_count, shards, keyframes, align=align, min_frames=1000)
+    assert 1 <= len(plan) <= min(shards, frame_count // 1000)
+    assert plan[0][0] == 0 and plan[-1][1] is None
+    for (_, stop), (start, _) in zip(plan, plan[1:]):
+        assert stop == start
+        assert start % align == 0
+        assert start in {k - k % align for k in keyframes}
+    starts = [start for start, _ in plan]
+    assert starts == sorted(set(starts))
+
+
+def test_plan_shards_without_keyframes_splits_evenly():
+    assert plan_shards(9000, 3, min_frames=1000) == [(0, 3000), (3000, 6000), (6000, None)]
+    assert plan_shards(1500, 4, min_frames=1000) == [(0, None)]
+
+
+@pytest.mark.parametrize("start,warmup,align", [(0, 60, 1), (3000, 60, 1), (3000, 60, 4), (100, 200, 3)])
+def test_decode_start_warms_up_from_a_keyframe(start, warmup, align):
+    keyframes = list(range(0, 10000, 250))
+    first = decode_start(start, warmup, keyframes, align)
+    if start == 0:
+        assert first == 0
+        return
+    assert first <= max(start - warmup, 0)
+    assert first % align == 0
+    # The latest keyframe at or before the warm-up start, rounded down to align.
+    keyframe = max(k for k in keyframes if k <= max(start - warmup, 0))
+    assert first == keyframe - keyframe % align
+
+
+def test_slice_and_concat_round_trip():
+    serial = DetectionStore.from_frames(random_frames(0, 500))
+    plan = [(0, 120), (120, 121), (121, 400), (400, None)]
+    parts = [serial.slice_frames(start, stop) for start, stop in plan]
+    assert_same_store(DetectionStore.concat(parts), serial)
+    assert len(serial.slice_frames(50, 50)) == 0
+    assert_same_store(serial.slice_frames(0), serial)
+
+
+@pytest.mark.parametrize("stride", [1, 3])
+def test_merged_shards_match_a_serial_run(stride):
+    """Merging shard stores as detect_video_sharded does, with warm-up and overrun frames dropped."""
+    frame_count = 6000
+    keyframes = list(range(0, frame_count, 250))
+    serial = DetectionStore.from_frames(random_frames(1, frame_count))
+    stores = []
+    for start, stop in plan_shards(frame_count, 4, keyframes, align=stride, min_frames=1000):
+        first = decode_start(start, 60, keyframes, stride)
+        end = None if stop is None else stop + (stride if stride > 1 else 0)
+        # What the shard's own analysis of frames [first, end) produces.
+        shard = serial.slice_frames(first, end)
+        stores.append(shard.slice_frames(start - first, None if stop is None else stop - first))
+    assert_same_store(DetectionStore.concat(stores), serial)
+
+
+def test_single_worker_skips_the_keyframe_probe(monkeypatch):
+    def probe(video_path):
+        raise AssertionError("probed keyframes for a serial run")
+    serial = DetectionStore.from_frames(random_frames(2, 10))
+    monkeypatch.setattr(predictions_logic, "probe_keyframes", probe)
+    monkeypatch.setattr(predictions_logic, "detect_video_store", lambda *args, **kwargs: serial)
+    assert predictions_logic.detect_video_sharded("game.mp4", workers=1) is serial